@@ -1,17 +1,17 @@
 import logging
 
+from utils.command import BaseCommand
 from utils.helpers import get_config
 from utils.slackparse import SlackArgParse
 from utils.exceptions import JockBotException
 
-class BotCommand(object):
+class BotCommand(BaseCommand):
     """Create Example object from Slack event"""
     def __init__(self, event, user):
         self.config = get_config('example.json')
         self.parsed_args = SlackArgParse(self.config['valid_args'], self.config['options'], event['text'])
         self.args = self.parsed_args.args
         self.option = self.parsed_args.option
-        self.response = self.run_cmd()
 
     def run_cmd(self):
         """
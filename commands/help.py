@@ -1,7 +1,8 @@
+from utils.command import BaseCommand
 from utils.helpers import get_config
 
 
-class BotCommand(object):
+class BotCommand(BaseCommand):
     """Create help object from Slack event"""
     def __init__(self, event, user):
         self.config = get_config('help.json')
@@ -14,8 +15,6 @@ class BotCommand(object):
 
     def run_cmd(self, *args):
         """Run help command"""
-        conf = get_config('help.json')
-        response = conf["help"]
         if not self.option:
             response = self.config["help"]
         else:
@@ -7,6 +7,7 @@ from libs.slack_nhl import SlackNHL
 from libs.slack_nfl import SlackNFL
 from libs.slack_mlb import SlackMLB
 from utils.exceptions import JockBotException
+from utils.command import BaseCommand
 from utils.helpers import get_config, try_request
 from utils.slackparse import SlackArgParse
 
@@ -16,7 +17,7 @@ class SlackNBA:
         pass
 
 
-class BotCommand(object):
+class BotCommand(BaseCommand):
     """Create Geo object from Slack event"""
     def __init__(self, event, user):
         self.text = event['text']
@@ -26,7 +27,6 @@ class BotCommand(object):
         self.option = self.parsed_args.option
         self.league = self._get_league()
         self.team_name = self._get_team_name()
-        self.response = self.run_cmd()
 
     def run_cmd(self):
         self._verify_command()
@@ -1,14 +1,19 @@
 
 import datetime
+import functools
 import logging  # noqa
 
 
 from libs.slack_nhl import SlackNHL
+from libs.slack_nhl import NO_GAMES_REPLY as NHL_NO_GAMES
 from libs.slack_nfl import SlackNFL
 from libs.slack_mlb import SlackMLB
+from libs.slack_mlb import NO_GAMES_REPLY as MLB_NO_GAMES
 from utils.exceptions import JockBotException
-from utils.helpers import get_config, try_request
+from utils.command import BaseCommand
+from utils.helpers import get_config
 from utils.slackparse import SlackArgParse
+from utils.subqueries import LEAGUE_POOL, run_parts
 
 
 class SlackNBA:
@@ -16,8 +21,20 @@ class SlackNBA:
         pass
 
 
-class BotCommand(object):
+class BotCommand(BaseCommand):
     """Create Geo object from Slack event"""
+    league_commands = {
+        'nhl': SlackNHL,
+        'mlb': SlackMLB,
+        'nfl': SlackNFL,
+        'nba': SlackNBA
+    }
+    # Leagues with a Slack scores reply and the reply they give with no games
+    scores_leagues = {
+        'nhl': NHL_NO_GAMES,
+        'mlb': MLB_NO_GAMES
+    }
+
     def __init__(self, event, user):
         self.text = event['text']
         self.config = get_config('config.json')
@@ -26,30 +43,56 @@ class BotCommand(object):
         self.option = self.parsed_args.option
         self.league = self._get_league()
         self.team_name = self._get_team_name()
-        self.response = self.run_cmd()
 
     def run_cmd(self):
         self._verify_command()
-        if self.text.split()[1] == 'help':
+        if self.text.split()[1:2] == ['help']:
             response = "\n".join(self.config['help'])
         elif not self.option:
             response = self._all_scores()
+        elif self.option not in self.scores_leagues:
+            raise JockBotException(f"{self.option.upper()} scores are not supported yet")
         else:
-            league_command = {
-                'nba': SlackNBA,
-                'nfl': SlackNFL,
-                'nhl': SlackNHL,
-                'mlb': SlackMLB
-            }
-            command = league_command.get(self.option)
-            response = command(self.args, option='scores', team=self.team_name)
-        return response.reply
+            command = self.league_commands.get(self.option)
+            response = command(self.args, option='scores', team=self.team_name).reply
+        return response
 
     def _all_scores(self):
-        """example request using try_request wrapper"""
-        url = self.config['url']
-        request = try_request('example', 'POST', url, data="", verify=False, timeout=10)
-        return request
+        """
+        Get scores for every league at once, leagues that are slow, failing,
+        without games or without a scores reply are left out with a note
+        """
+        timeouts = self.config['scores']['league_timeouts']
+        leagues = {league: functools.partial(self._league_scores, league) for league in self.scores_leagues}
+        scores = run_parts(leagues, executor=LEAGUE_POOL, timeouts=timeouts)
+        reply = []
+        idle = []
+        missing = []
+        for league in leagues:
+            response = scores.get(league)
+            if not response:
+                missing.append(league.upper())
+            elif response.startswith(self.scores_leagues[league]):
+                idle.append(league.upper())
+            else:
+                reply.append(response)
+        if not reply and not idle:
+            raise JockBotException("No league scores are available right now")
+        unsupported = [i.upper() for i in self.league_commands if i not in self.scores_leagues]
+        notes = [
+            f"{label}: {', '.join(names)}" for label, names in (
+                ('No games', idle),
+                ('Unavailable right now', missing),
+                ('Not supported yet', unsupported)
+            ) if names
+        ]
+        if notes:
+            reply.append(f"_{' | '.join(notes)}_")
+        return "\n".join(reply)
+
+    def _league_scores(self, league):
+        """Get the scores reply of one league"""
+        return self.league_commands[league](self.args, option='scores').reply
 
     def _get_league(self):
         """Get the league for the requested command"""
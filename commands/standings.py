@@ -7,6 +7,7 @@ from libs.slack_nhl import SlackNHL
 from libs.slack_nfl import SlackNFL
 from libs.slack_mlb import SlackMLB
 from utils.exceptions import JockBotException
+from utils.command import BaseCommand
 from utils.helpers import get_config, try_request
 from utils.slackparse import SlackArgParse
 
@@ -16,7 +17,7 @@ class SlackNBA:
         pass
 
 
-class BotCommand(object):
+class BotCommand(BaseCommand):
     """Create Geo object from Slack event"""
     def __init__(self, event, user):
         self.text = event['text']
@@ -25,7 +26,6 @@ class BotCommand(object):
         self.args = self.parsed_args.args
         self.option = self.parsed_args.option
         self.league = self._get_league()
-        self.response = self.run_cmd()
 
     def run_cmd(self):
         if self.text.split()[1] == 'help':
@@ -1,60 +1,54 @@
 import aiohttp
 import asyncio
 import base64
+import collections
 import datetime
 import json  # noqa
 import logging
 import os
 import requests
-import socket
+import threading
 import time
 
-from utils.helpers import get_config
+from libs.nfl_schedule import ScheduleIndex
+from libs.nfl_stats import GameStats, SeasonColumns
+from libs.nfl_store import BOXSCORES
+from utils.helpers import HTTP_TIMEOUT, freeze, get_config, http_session
 from utils.exceptions import NFLRequestException
+from utils.singleflight import FLIGHTS
+from utils.stats_cache import STATS_CACHE
 
+# Seconds between refreshes of each dataset held by the NFL data service
+REFRESH_INTERVALS = {
+    'schedule': 6 * 3600,
+    'standings': 900,
+    'results': 300
+}
+REFRESH_TICK = 30
+SNAPSHOT_TIMEOUT = 30
 
-class NFL:
+
+class MySportsFeeds:
     """
-    NFL Games object
+    Mysportsfeeds API client
     """
-    def __init__(self, api_version="1.2"):
+    def __init__(self, api_version="1.2", max_concurrency=4, request_timeout=10):
         self.api_key = os.environ.get('MYSPORTSFEEDS_API_KEY')
         self.version = api_version
         self.password = os.environ.get('MYSPORTSFEEDS_PASSWORD')
         self.date = datetime.datetime.now()
         self.base_url = f"https://api.mysportsfeeds.com/v{self.version}/pull/nfl/"
-        self.session = requests.session()
-        self.league_schedule = self.get_schedule()
-        self.upcoming_games = self.get_games_by_week()
-        self.config = get_config('nfl_config.json')
-        self.league_game_results = []
-        self.played_games = []
-        self.unplayed_games = []
-        self.league_played_games = []
-        self.league_unplayed_games = []
-        self.loop = asyncio.new_event_loop()
-        self.loop.run_until_complete(self.parse_league_games())
-        self.loop.run_until_complete(self.gather_league_data())
-
-    def __repr__(self):
-        return f"{self.league_schedule}"
-
-    @property
-    def recent_league_games(self):
-        last_completed_week = int(self.upcoming_week) - 1
-        return self.get_games_by_week(week=str(last_completed_week))
-
-    @property
-    def upcoming_week(self):
-        """
-        Get the upcoming week for the NFL
-        """
-        for game in self.league_schedule:
-            game_date = datetime.datetime.strptime(game['date'], "%Y-%m-%d")
-            if game_date >= self.date:
-                week = game['week']
-                break
-        return week
+        self.session = http_session()
+        self.max_concurrency = max_concurrency
+        self.request_timeout = request_timeout
+        self.http = None
+        self.semaphore = None
+        self.loop = None
+        self.run_lock = threading.Lock()
+        self.fetch_errors = []
+        self.boxscores = BOXSCORES
+        self.cache = STATS_CACHE
+        self.stale_age = None
 
     @property
     def season(self):
@@ -77,6 +71,376 @@ class NFL:
         }
         return headers
 
+    def api_request(self, url):
+        """
+        Request data from Mysportsfeeds API
+        """
+        logging.info(f"URL | {url}")
+        try:
+            request = http_session().get(url, headers=self._headers(), verify=False,
+                                         timeout=self.request_timeout)
+        except requests.exceptions.RequestException as err:
+            raise NFLRequestException(f"Error connecting to Mysportsfeeds API: {err}")
+        if request.status_code != 200:
+            raise NFLRequestException(f"{request.status_code} Error with Mysportsfeeds API request")
+        data = request.json()
+        return data
+
+    def cached_request(self, namespace, key, request, *args):
+        """
+        Return a value from the stats cache, requesting it on a miss
+
+        Concurrent misses share one request. If Mysportsfeeds fails, an
+        expired cached value is returned and its age kept in stale_age, the
+        error is only raised if nothing was ever cached
+        """
+        value = self.cache.get(namespace, key)
+        if value:
+            return value
+        try:
+            return FLIGHTS.do((namespace, key), request, *args)
+        except NFLRequestException as err:
+            expired = self.cache.stale(namespace, key)
+            if expired is None:
+                raise
+            value, age = expired
+            logging.error(f"Mysportsfeeds request failed, serving expired data | {namespace} {key} | {err}")
+            self.stale_age = max(self.stale_age or 0, age)
+            return value
+
+    def get_schedule(self, team_abbreviation=None, season='2018-regular'):
+        """
+        Get NFL season schedule, through the stats cache
+        """
+        key = f"{season}_{team_abbreviation or 'league'}"
+        return self.cached_request('nfl_schedule', key, self.request_schedule, season, team_abbreviation, key)
+
+    def request_schedule(self, season, team_abbreviation, key):
+        """
+        Request the season schedule and cache it, run once at a time
+        """
+        schedule = self.cache.get('nfl_schedule', key)
+        if schedule:
+            return schedule
+        if not team_abbreviation:
+            url = f"{self.base_url}{season}/full_game_schedule.json"
+        else:
+            url = f"{self.base_url}{season}/full_game_schedule.json?team={team_abbreviation}"
+        data = self.api_request(url)
+        if data:
+            schedule = data['fullgameschedule']['gameentry']
+            self.cache.set('nfl_schedule', key, schedule)
+            return schedule
+
+    async def fetch_json(self, url, headers=None):
+        """
+        Request data from Mysportsfeeds API over the client's shared aiohttp
+        session, limited to max_concurrency requests in flight
+        """
+        if self.http is None:
+            timeout = aiohttp.ClientTimeout(total=self.request_timeout)
+            self.http = aiohttp.ClientSession(timeout=timeout)
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        logging.info(f"URL | {url}")
+        async with self.semaphore:
+            try:
+                async with self.http.get(url, headers=headers or self._headers()) as response:
+                    if response.status != 200:
+                        raise NFLRequestException(f"{response.status} Error with Mysportsfeeds API request")
+                    return await response.json()
+            except aiohttp.ContentTypeError:
+                raise NFLRequestException("Error retrieving data from Mysportsfeeds API")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                raise NFLRequestException(f"Error connecting to Mysportsfeeds API: {err.__class__.__name__}")
+
+    async def gather_requests(self, coros):
+        """
+        Run request coroutines concurrently and report their errors together
+
+        Failed requests are logged and kept in fetch_errors, an
+        NFLRequestException is only raised if every request failed
+        """
+        results = await asyncio.gather(*coros, return_exceptions=True)
+        errors = [i for i in results if isinstance(i, Exception)]
+        if errors:
+            self.fetch_errors.extend(errors)
+            summary = "; ".join(sorted(set(str(i) for i in errors)))
+            logging.error(f"{len(errors)} of {len(results)} Mysportsfeeds requests failed | {summary}")
+            if len(errors) == len(results):
+                raise NFLRequestException(f"Mysportsfeeds requests failed: {summary}")
+        return results
+
+    def run(self, coro):
+        """
+        Run a coroutine on the client's event loop
+
+        The loop and aiohttp session are created on first use and reused by
+        every later run until close() is called
+        """
+        with self.run_lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+            return self.loop.run_until_complete(coro)
+
+    def close(self):
+        """
+        Close the client's aiohttp session and event loop
+        """
+        with self.run_lock:
+            if self.loop is None:
+                return
+            if self.http is not None:
+                self.loop.run_until_complete(self.http.close())
+                self.http = None
+                self.semaphore = None
+            self.loop.close()
+            self.loop = None
+
+    async def fetch_boxscore(self, season, game):
+        """
+        Return a game's boxscore, from the boxscore store if it is final
+        """
+        data = self.boxscores.get(season, game['id'])
+        if data is not None:
+            return data
+        url = f"{self.base_url}{season}-regular/game_boxscore.json?gameid={game['id']}&playerstats=none"
+        data = await self.fetch_json(url)
+        if data and self.boxscores.is_final(game, self.date) and self.boxscores.is_complete(data):
+            self.boxscores.put(season, game['id'], data)
+        return data
+
+    async def fetch_game_results(self, season, game):
+        """
+        Return a copy of a schedule entry with its final or current score
+        """
+        data = await self.fetch_boxscore(season, game)
+        if data:
+            game = dict(game)
+            game['game_score'] = data['gameboxscore']['quarterSummary']['quarterTotals']
+            return game
+
+    async def fetch_standings(self):
+        url = "https://api.mysportsfeeds.com/v2.0/pull/nfl/2018-regular/standings.json"
+        data = await self.fetch_json(url, headers=self._headers('MYSPORTSFEEDS'))
+        if data:
+            return data['teams']
+
+
+NFLSnapshot = collections.namedtuple('NFLSnapshot', ['schedule', 'index', 'standings', 'results', 'updated'])
+
+
+class NFLDataService:
+    """
+    Process wide NFL league data, refreshed in a background thread
+
+    The schedule, standings and current week's results are kept in memory
+    and published as a read-only NFLSnapshot. Each dataset is refreshed on
+    its own interval and results are refreshed incrementally, games that are
+    final and already held are never requested again.
+    """
+    def __init__(self, client=None, intervals=None):
+        self.client = client or MySportsFeeds()
+        self.intervals = dict(REFRESH_INTERVALS, **(intervals or {}))
+        self.current = None
+        self.refreshed = {}
+        self.results = {}
+        self.last_error = None
+        self.first_refresh = threading.Event()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='nfl-data-service', daemon=True)
+                self.thread.start()
+        return self
+
+    def _run(self):
+        self.client.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.client.loop)
+        self.client.loop.run_until_complete(self._refresh_forever())
+
+    async def _refresh_forever(self):
+        while True:
+            try:
+                await self.refresh()
+                self.last_error = None
+            except Exception as err:
+                self.last_error = err
+                logging.error(f"NFL data refresh failed | {err}")
+            self.first_refresh.set()
+            await asyncio.sleep(REFRESH_TICK)
+
+    def _due(self, dataset, now):
+        refreshed = self.refreshed.get(dataset)
+        return refreshed is None or now - refreshed >= self.intervals[dataset]
+
+    async def refresh(self):
+        """
+        Refresh every dataset whose interval has passed and publish a new
+        snapshot if anything changed
+        """
+        loop = asyncio.get_event_loop()
+        now = time.monotonic()
+        self.client.date = datetime.datetime.now()
+        current = self.current
+        schedule = current.schedule if current else None
+        index = current.index if current else None
+        standings = current.standings if current else None
+        changed = False
+        if schedule is None or self._due('schedule', now):
+            schedule = freeze(await loop.run_in_executor(None, self.client.get_schedule))
+            index = ScheduleIndex(schedule)
+            self.refreshed['schedule'] = now
+            changed = True
+        if standings is None or self._due('standings', now):
+            standings = freeze(await self.client.fetch_standings())
+            self.refreshed['standings'] = now
+            changed = True
+        if current is None or self._due('results', now):
+            changed = await self.refresh_results(index) or changed
+            self.refreshed['results'] = now
+        if changed:
+            results = tuple(self.results[i] for i in sorted(self.results))
+            self.current = NFLSnapshot(schedule, index, standings, results, datetime.datetime.now())
+            logging.info(f"NFL snapshot updated | {len(schedule)} games | {len(results)} results")
+
+    async def refresh_results(self, index):
+        """
+        Fetch results for the current games that aren't held or whose
+        boxscore isn't stored as final yet
+        """
+        games = index.current_games(self.client.date)
+        game_ids = {game['id'] for game in games}
+        stale = [i for i in self.results if i not in game_ids]
+        for game_id in stale:
+            del self.results[game_id]
+        pending = [
+            game for game in games
+            if game['id'] not in self.results
+            or self.client.boxscores.get(self.client.season, game['id']) is None
+        ]
+        if not pending:
+            return bool(stale)
+        results = await self.client.gather_requests(
+            self.client.fetch_game_results(self.client.season, game) for game in pending
+        )
+        for game, result in zip(pending, results):
+            if isinstance(result, dict):
+                self.results[game['id']] = freeze(result)
+        return True
+
+    def snapshot(self, timeout=SNAPSHOT_TIMEOUT):
+        """
+        Return the latest NFLSnapshot, waiting for the first refresh if needed
+        """
+        self.start()
+        if self.current is None:
+            self.first_refresh.wait(timeout)
+        if self.current is None:
+            raise NFLRequestException(f"NFL data is unavailable: {self.last_error}")
+        return self.current
+
+
+NFL_SERVICE = None
+NFL_SERVICE_LOCK = threading.Lock()
+
+
+def nfl_service():
+    """
+    Return the process wide NFL data service, starting it on first use
+    """
+    global NFL_SERVICE
+    with NFL_SERVICE_LOCK:
+        if NFL_SERVICE is None:
+            NFL_SERVICE = NFLDataService().start()
+    return NFL_SERVICE
+
+
+class LazyData:
+    """
+    Load data attributes the first time they are read
+
+    LAZY_ATTRIBUTES maps a loader method to the attributes it sets, a loader
+    only runs when one of its attributes is missing from the instance
+    """
+    LAZY_ATTRIBUTES = {}
+    lazy_loaders = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        loaders = {}
+        for klass in reversed(cls.__mro__):
+            for loader, attributes in vars(klass).get('LAZY_ATTRIBUTES', {}).items():
+                loaders.update(dict.fromkeys(attributes, loader))
+        cls.lazy_loaders = loaders
+
+    def __getattr__(self, name):
+        loader = self.lazy_loaders.get(name)
+        if loader is None:
+            raise AttributeError(f"{self.__class__.__name__!r} object has no attribute {name!r}")
+        getattr(self, loader)()
+        try:
+            return self.__dict__[name]
+        except KeyError:
+            raise AttributeError(f"{loader} did not load {name!r}")
+
+
+class NFL(LazyData, MySportsFeeds):
+    """
+    NFL Games object
+
+    League data is read from the NFL data service snapshot when it's first
+    needed, nothing is requested from Mysportsfeeds when the object is built
+    """
+    LAZY_ATTRIBUTES = {
+        'load_config': ('config',),
+        'load_snapshot': (
+            'league_schedule', 'schedule_index', 'standings_data', 'league_game_results', 'data_updated'
+        ),
+        'load_upcoming_games': ('upcoming_games',),
+        'parse_league_games': ('league_played_games', 'league_unplayed_games')
+    }
+
+    def __init__(self, service=None, **kwargs):
+        super().__init__(**kwargs)
+        self.service = service
+
+    def load_config(self):
+        self.config = get_config('nfl_config.json')
+
+    def load_snapshot(self):
+        """
+        Read league data from the NFL data service
+        """
+        if self.service is None:
+            self.service = nfl_service()
+        snapshot = self.service.snapshot()
+        self.league_schedule = snapshot.schedule
+        self.schedule_index = snapshot.index
+        self.standings_data = snapshot.standings
+        self.league_game_results = list(snapshot.results)
+        self.data_updated = snapshot.updated
+
+    def load_upcoming_games(self):
+        self.upcoming_games = self.get_games_by_week()
+
+    def __repr__(self):
+        return f"{self.league_schedule}"
+
+    @property
+    def recent_league_games(self):
+        last_completed_week = int(self.upcoming_week) - 1
+        return self.get_games_by_week(week=str(last_completed_week))
+
+    @property
+    def upcoming_week(self):
+        """
+        Get the upcoming week for the NFL
+        """
+        return self.schedule_index.upcoming_week(self.date)
+
     @property
     def standings(self):
         standings = {
@@ -111,72 +475,22 @@ class NFL:
             standings['records'][name] = record
         return standings
 
-    async def league_schedule_parser(self):
-        # self.league_schedule = await asyncio.gather([self.loop.create_task(self.get_schedule(self.team_abbreviation))])
-        parse_games = asyncio.create_task(self.parse_league_games())
-        # get_recent_league_games = asyncio.create_task(self.get_most_recent_games())
-        tasks = [
-            parse_games
-            # get_recent_league_games
-        ]
-        await asyncio.gather(*tasks)
-
-    async def parse_league_games(self):
-        """
-        From an NFL team's schedule separate games that have been completed and
-        games that haven't been played yet
-        """
-        for game in self.upcoming_games:
-            game_date = datetime.datetime.strptime(game['date'], "%Y-%m-%d")
-            if self.date > game_date:
-                self.league_played_games.append(game)
-            else:
-                self.league_unplayed_games.append(game)
-
-    def api_request(self, url):
-        """
-        Request data from Mysportsfeeds API
-        """
-        logging.info(f"URL | {url}")
-        session = requests.session()
-        try:
-            request = session.get(url, headers=self._headers(), verify=False)
-        except socket.gaierror:
-            time.sleep(1)
-            request = session.get(url, headers=self._headers(), verify=False)
-        except requests.exceptions.ConnectionError:
-            time.sleep(2)
-            request = session.get(url, headers=self._headers(), verify=False)
-        if request.status_code != 200:
-            raise NFLRequestException(f"{request.status_code} Error with Mysportsfeeds API request")
-        data = request.json()
-        return data
-
-    def get_schedule(self, team_abbreviation=None):
+    def parse_league_games(self):
         """
-        Get NFL season schedule
+        From the upcoming week's games separate games that have been
+        completed and games that haven't been played yet
         """
-        if not team_abbreviation:
-            url = f"{self.base_url}2018-regular/full_game_schedule.json"
-        else:
-            url = f"{self.base_url}2018-regular/full_game_schedule.json?team={team_abbreviation}"
-        data = self.api_request(url)
-        if data:
-            schedule = data['fullgameschedule']['gameentry']
-            return schedule
+        self.league_played_games, self.league_unplayed_games = self.schedule_index.played_split(
+            self.upcoming_week, self.date
+        )
 
     def get_games_by_week(self, week=None):
         """
         Get games for the upcoming week
         """
-        games = []
         if not week:
             week = self.upcoming_week
-        schedule = self.league_schedule
-        for game in schedule:
-            if game['week'] == week:
-                games.append(game)
-        return games
+        return self.schedule_index.week_games(week)
 
     def league_scores(self):
         """
@@ -187,51 +501,6 @@ class NFL:
         scores = self.api_request(url)
         return scores['scoreboard']['gameScore']
 
-    async def gather_league_data(self):
-        tasks = [self.loop.create_task(self.fetch_standings())]
-        if self.league_played_games:
-            for game in self.league_played_games:
-                tasks.append(self.loop.create_task(self.fetch_game_results(self.season, game, 'league')))
-        else:
-            for game in self.recent_league_games:
-                tasks.append(self.loop.create_task(self.fetch_game_results(self.season, game, 'league')))
-        await asyncio.gather(*tasks)
-
-    async def fetch_game_results(self, season, game, type):
-        url = f"{self.base_url}{season}-regular/game_boxscore.json?gameid={game['id']}&playerstats=none"
-        logging.info(url)
-        async with aiohttp.ClientSession() as self.session:
-            async with self.session.get(url, headers=self._headers()) as response:
-                try:
-                    data = await response.json()
-                except aiohttp.client_exceptions.ContentTypeError as err:
-                    if 'status' in dir(response):
-                        logging.info(response.status)
-                    logging.error(f"Error retrieving data from Mysportsfeeds API\n\n{err}")
-                    data = None
-                    pass
-                    # raise NFLRequestException(f"Error retrieving data from Mysportsfeeds API\n\n{response.status}\n{response.reason}\n{response.raw_headers}\n{response.content}")
-            if data:
-                game_score = data['gameboxscore']['quarterSummary']['quarterTotals']
-                game['game_score'] = game_score
-                if type == 'team':
-                    self.team_game_results.append(game)
-                elif type == 'league':
-                    self.league_game_results.append(game)
-
-    async def fetch_standings(self):
-        url = "https://api.mysportsfeeds.com/v2.0/pull/nfl/2018-regular/standings.json"
-        async with aiohttp.ClientSession() as self.session:
-            async with self.session.get(url, headers=self._headers('MYSPORTSFEEDS')) as response:
-                try:
-                    data = await response.json()
-                except aiohttp.client_exceptions.ContentTypeError:
-                    logging.error("Error retrieving data from Mysportsfeeds API")
-                    raise NFLRequestException(f"Error retrieving data from Mysportsfeeds API")
-            if data:
-                teams_list = data['teams']
-                self.standings_data = teams_list
-
     def parse_division_standings(self):
         stats = self.fetch_team_stats()
         divisions = stats['division']
@@ -254,105 +523,141 @@ class NFL:
             standings.append(div)
         return standings
 
-    def fetch_team_stats(self):
-        stats = self.check_data_cache('nfl_team_stats.json')
+    def fetch_team_stats(self, season='2018-regular'):
+        """
+        Get division team standings from Mysportsfeeds API, through the stats
+        cache
+        """
+        key = f"division_team_standings_{season}"
+        return self.cached_request('nfl_standings', key, self.request_team_stats, season, key)
+
+    def request_team_stats(self, season, key):
+        """
+        Request division team standings and cache them, run once at a time
+        """
+        stats = self.cache.get('nfl_standings', key)
         if stats:
             return stats
-        url = 'https://api.mysportsfeeds.com/v1.2/pull/nfl/2018-regular/division_team_standings.json'
+        url = f"{self.base_url}{season}/division_team_standings.json"
         data = self.api_request(url)
         stats = data['divisionteamstandings']
-        stats['timestamp'] = int(datetime.datetime.now().timestamp())
-        with open('stats_cache/team_stats.json', 'w+') as stats_file:
-            stats_file.write(json.dumps(stats, indent=2))
+        self.cache.set('nfl_standings', key, stats)
         return stats
 
-    def check_data_cache(self, file_name):
-        try:
-            with open(f'stats_cache/{file_name}', 'r') as read_file:
-                data = json.load(read_file)
-        except FileNotFoundError:
-            data = None
-            return data
-
-        data_age = data['timestamp'] + 43200
-        if data_age < int(self.date.timestamp()):
-            data = None
-        return data
-
     def live_scores(self):
-        url = f"{self._base_url}2018-regular/date/20181126/games.json"
-        data = self._api_request(url)
+        url = f"{self.base_url}2018-regular/date/20181126/games.json"
+        data = self.api_request(url)
         logging.info(json.dumps(data, indent=2))
-        pass
 
 
 class NFLLeague(NFL):
-    def __init__(self):
-        super().__inii__(self)
-
-    def live_scores(self):
-        url = f"{self._base_url}2018-regular/date/20181126/games.json"
-        data = self._api_request(url)
-        logging.info(json.dumps(data, indent=2))
-        pass
+    """
+    Create NFL league object
+    """
 
 
 class NFLTeam(NFL):
     """
     Create NFL team object
+
+    Each group of team data is requested or parsed the first time one of its
+    attributes is read, so a reply only pays for the data it displays
     """
-    def __init__(self, team=None):
-        super().__init__()
+    LAZY_ATTRIBUTES = {
+        'load_schedule': ('schedule',),
+        'parse_games': ('played_games', 'unplayed_games'),
+        'load_stats': ('stats',),
+        'load_game_logs': ('game_logs',),
+        'load_game_results': ('team_game_results',),
+        'parse_game_stats': ('team_game_stats',),
+        'parse_totals': (
+            'penalties', 'penalty_yards', 'total_yards_gained', 'yards_per_play', 'offense_plays',
+            'third_downs', 'third_down_attempts', 'third_down_percentage', 'pass_attempts',
+            'pass_completions', 'pass_yards', 'pass_yards_per_attempt', 'games_played',
+            'touchdowns_scored', 'points_for', 'points_against', 'first_down_total',
+            'first_down_pass', 'first_down_rush', 'rush_yards', 'rush_attempts', 'rush_average',
+            'rush_touchdowns', 'receptions', 'offense_sacks', 'defense_sacks', 'points_diff',
+            'offense_yards_per_game'
+        ),
+        'load_season_columns': ('season_columns',),
+        'parse_season_stats': (
+            'road_record', 'home_record', 'turnovers', 'takeaways', 'turnover_diff',
+            'defense_plays', 'total_yards_allowed', 'defense_yards_per_play', 'defense_yards_per_game',
+            'first_quarter_points_scored', 'second_quarter_points_scored',
+            'third_quarter_points_scored', 'fourth_quarter_points_scored',
+            'first_quarter_points_allowed', 'second_quarter_points_allowed',
+            'third_quarter_points_allowed', 'fourth_quarter_points_allowed'
+        )
+    }
+
+    def __init__(self, team=None, data_path='boxscore', **kwargs):
+        super().__init__(**kwargs)
         self.team = team
-        self.team_abbreviation = self.config['abbreviations'].get(team)
+        self.data_path = data_path
+
+    @property
+    def team_abbreviation(self):
+        return self.config['abbreviations'].get(self.team)
+
+    def load_schedule(self):
         self.schedule = self.get_schedule(self.team_abbreviation)
-        self.game_results = []
-        self.team_game_results = []
-        self.team_game_stats = []
+
+    def load_stats(self):
         self.stats = self.parse_stats(self.team_abbreviation)
-        self.loop.run_until_complete(self.schedule_parser())
-        self.loop.run_until_complete(self.gather_team_game_results())
-        self.loop.run_until_complete(self.gather_team_stats())
-        self.loop.close()
-
-    async def schedule_parser(self):
-        # parse_games = asyncio.create_task(self.parse_games())
-        # game_logs = asyncio.create_task(self.get_game_logs())
-        # get_recent_league_games = asyncio.create_task(self.get_most_recent_games())
-        # self.schedule = await asyncio.gather([self.loop.create_task(self.get_schedule(self.team_abbreviation))])
-        tasks = [
-            self.loop.create_task(self.parse_games())
-            # game_logs
-        ]
-        await asyncio.gather(*tasks)
+
+    def load_game_logs(self):
+        game_logs = self.run(self.fetch_game_logs(self.team_abbreviation))
+        self.game_logs = game_logs['teamgamelogs']['gamelogs']
+
+    def load_game_results(self):
+        """
+        Get the played games with their scores and both teams' stats
+        """
+        self.team_game_results = []
+        if self.data_path == 'bulk':
+            self.run(self.gather_team_game_results_bulk())
+        else:
+            self.run(self.gather_team_game_results())
 
     async def fetch_game_logs(self, team_abbreviation):
         url = f"{self.base_url}{self.season}-regular/team_gamelogs.json?team={team_abbreviation}"
-        async with aiohttp.ClientSession() as self.session:
-            async with self.session.get(url, headers=self._headers()) as response:
-                data = await response.json()
-                return data
+        data = await self.fetch_json(url)
+        return data
+
+    async def fetch_season_games(self, team_abbreviation):
+        """
+        Get every game of the team's season with quarter by quarter scores
+        """
+        url = (f"https://api.mysportsfeeds.com/v2.0/pull/nfl/{self.season}-regular/games.json"
+               f"?team={team_abbreviation}")
+        data = await self.fetch_json(url, headers=self._headers('MYSPORTSFEEDS'))
+        return data
 
     async def fetch_team_game_results(self, season, game):
-        url = f"{self.base_url}{season}-regular/game_boxscore.json?gameid={game['id']}&playerstats=none"
-        async with aiohttp.ClientSession() as self.session:
-            async with self.session.get(url, headers=self._headers()) as response:
-                try:
-                    data = await response.json()
-                except aiohttp.client_exceptions.ContentTypeError:
-                    logging.error("Error retrieving data from Mysportsfeeds API")
-                    data = None
-                    pass
-                if data:
-                    quarter_summary = data['gameboxscore']['quarterSummary']
-                    game_score = data['gameboxscore']['quarterSummary']['quarterTotals']
-                    away_stats = data['gameboxscore']['awayTeam']['awayTeamStats']
-                    home_stats = data['gameboxscore']['homeTeam']['homeTeamStats']
-                    game['quarter_summary'] = quarter_summary
-                    game['game_score'] = game_score
-                    game['awayTeam']['stats'] = away_stats
-                    game['homeTeam']['stats'] = home_stats
-                    self.team_game_results.append(game)
+        data = await self.fetch_boxscore(season, game)
+        if data:
+            quarter_summary = data['gameboxscore']['quarterSummary']
+            game_score = data['gameboxscore']['quarterSummary']['quarterTotals']
+            away_stats = data['gameboxscore']['awayTeam']['awayTeamStats']
+            home_stats = data['gameboxscore']['homeTeam']['homeTeamStats']
+            self.team_game_results.append(
+                self.with_results(game, quarter_summary, game_score, away_stats, home_stats)
+            )
+
+    @staticmethod
+    def with_results(game, quarter_summary, game_score, away_stats, home_stats):
+        """
+        Return a copy of a schedule entry with its results
+
+        Schedule entries are shared through the stats cache, so neither the
+        game nor its team dicts are written to
+        """
+        game = dict(game)
+        game['quarter_summary'] = quarter_summary
+        game['game_score'] = game_score
+        game['awayTeam'] = dict(game['awayTeam'], stats=away_stats)
+        game['homeTeam'] = dict(game['homeTeam'], stats=home_stats)
+        return game
 
     async def gather_team_game_results(self):
         """
@@ -360,23 +665,59 @@ class NFLTeam(NFL):
         """
         tasks = []
         for game in self.played_games:
-            tasks.append(self.loop.create_task(self.fetch_team_game_results(self.season, game)))
-        await asyncio.gather(*tasks)
-        await asyncio.gather(self.parse_game_stats())
-
-    async def gather_team_stats(self):
-        tasks = [
-            self.loop.create_task(self.offense_points_by_quarter()),
-            self.loop.create_task(self.defense_points_by_quarter()),
-            self.loop.create_task(self.parse_road_record()),
-            self.loop.create_task(self.parse_home_record()),
-            self.loop.create_task(self.parse_turnovers()),
-            self.loop.create_task(self.parse_totals()),
-            self.loop.create_task(self.parse_defensive_stats())
-        ]
-        await asyncio.gather(*tasks)
-
-    async def parse_totals(self):
+            tasks.append(self.fetch_team_game_results(self.season, game))
+        if tasks:
+            await self.gather_requests(tasks)
+
+    async def gather_team_game_results_bulk(self):
+        """
+        Build team_game_results from two seasonal bulk requests instead of
+        one boxscore request per game
+
+        Team gamelogs for the team and its opponents provide both sides'
+        stats and the seasonal games feed provides quarter scores, the games
+        end up in the same shape as the boxscore path
+        """
+        if self.played_games:
+            team = self.team_abbreviation.upper()
+            teams = {team}
+            for game in self.played_games:
+                teams.add(game['homeTeam']['Abbreviation'])
+                teams.add(game['awayTeam']['Abbreviation'])
+            game_logs, season_games = await asyncio.gather(
+                self.fetch_game_logs(",".join(sorted(teams))),
+                self.fetch_season_games(team)
+            )
+            team_stats = {}
+            for game_log in game_logs['teamgamelogs']['gamelogs']:
+                key = (str(game_log['game']['id']), game_log['team']['Abbreviation'])
+                team_stats[key] = game_log['stats']
+            scores = {str(i['schedule']['id']): i['score'] for i in season_games['games']}
+            for game in self.played_games:
+                game_id = str(game['id'])
+                home_stats = team_stats.get((game_id, game['homeTeam']['Abbreviation']))
+                away_stats = team_stats.get((game_id, game['awayTeam']['Abbreviation']))
+                score = scores.get(game_id)
+                if not home_stats or not away_stats or not score or not score.get('quarters'):
+                    logging.info(f"No bulk results for game {game_id}")
+                    continue
+                quarters = [
+                    {
+                        '@number': str(i['quarterNumber']),
+                        'awayScore': str(i['awayScore']),
+                        'homeScore': str(i['homeScore'])
+                    } for i in score['quarters']
+                ]
+                game_score = {
+                    'awayScore': str(score['awayScoreTotal']),
+                    'homeScore': str(score['homeScoreTotal'])
+                }
+                quarter_summary = {'quarter': quarters, 'quarterTotals': game_score}
+                self.team_game_results.append(
+                    self.with_results(game, quarter_summary, game_score, away_stats, home_stats)
+                )
+
+    def parse_totals(self):
         self.penalties = self.stats['Penalties']
         self.penalty_yards = self.stats['PenaltyYds']
         self.total_yards_gained = self.stats['OffenseYds']
@@ -406,64 +747,9 @@ class NFLTeam(NFL):
         self.points_diff = int(self.points_for) - int(self.points_against)
         self.offense_yards_per_game = self.stat_trim(int(self.total_yards_gained) / self.games_played)
 
-    async def get_game_logs(self):
-        game_logs = await self.fetch_game_logs(self.team_abbreviation)
-        self.game_logs = game_logs['teamgamelogs']['gamelogs']
-
-    async def parse_game_stats(self):
+    def parse_game_stats(self):
         team = self.team_abbreviation.upper()
-        for game in self.team_game_results:
-            game_stats = {'offense': {}, 'defense': {}}
-            home_team = game['homeTeam']['Abbreviation']
-            away_team = game['awayTeam']['Abbreviation']
-            game_stats['week'] = game['week']
-            game_stats['date'] = game['date']
-            game_stats['time'] = game['time']
-            if home_team == team:
-                game_stats['gameType'] = 'homeGame'
-                game_stats['opponent'] = away_team
-                game_stats['pointsFor'] = int(game['homeTeam']['stats']['PointsFor']['#text'])
-                game_stats['pointsAgainst'] = int(game['homeTeam']['stats']['PointsAgainst']['#text'])
-                game_stats['interceptionsThrown'] = int(game['homeTeam']['stats']['PassInt']['#text'])
-                game_stats['interceptions'] = int(game['homeTeam']['stats']['Interceptions']['#text'])
-                game_stats['fumblesLost'] = int(game['homeTeam']['stats']['FumLost']['#text'])
-                game_stats['fumblesRecovered'] = int(game['homeTeam']['stats']['FumOppRec']['#text'])
-                game_stats['offense']['yardsGained'] = int(game['homeTeam']['stats']['OffenseYds']['#text'])
-                game_stats['defense']['yardsAllowed'] = int(game['awayTeam']['stats']['OffenseYds']['#text'])
-                game_stats['defense']['plays'] = int(game['awayTeam']['stats']['OffensePlays']['#text'])
-                # game_stats['defense']['third_down_attempts'] = int(game['awayTeam']['stats']['ThirdDownsAtt']['#text'])
-                # game_stats['defense']['third_down_conversions'] = int(game['awayTeam']['stats']['ThirdDowns']['#text'])
-                game_stats['offense']['1stQuarterPoints'] = int(game['quarter_summary']['quarter'][0]['homeScore'])
-                game_stats['defense']['1stQuarterPoints'] = int(game['quarter_summary']['quarter'][0]['awayScore'])
-                game_stats['offense']['2ndQuarterPoints'] = int(game['quarter_summary']['quarter'][1]['homeScore'])
-                game_stats['defense']['2ndQuarterPoints'] = int(game['quarter_summary']['quarter'][1]['awayScore'])
-                game_stats['offense']['3rdQuarterPoints'] = int(game['quarter_summary']['quarter'][2]['homeScore'])
-                game_stats['defense']['3rdQuarterPoints'] = int(game['quarter_summary']['quarter'][2]['awayScore'])
-                game_stats['offense']['4thQuarterPoints'] = int(game['quarter_summary']['quarter'][3]['homeScore'])
-                game_stats['defense']['4thQuarterPoints'] = int(game['quarter_summary']['quarter'][3]['awayScore'])
-            else:
-                game_stats['gameType'] = 'roadGame'
-                game_stats['opponent'] = home_team
-                game_stats['pointsFor'] = int(game['awayTeam']['stats']['PointsFor']['#text'])
-                game_stats['pointsAgainst'] = int(game['awayTeam']['stats']['PointsAgainst']['#text'])
-                game_stats['interceptionsThrown'] = int(game['awayTeam']['stats']['PassInt']['#text'])
-                game_stats['interceptions'] = int(game['awayTeam']['stats']['Interceptions']['#text'])
-                game_stats['fumblesLost'] = int(game['awayTeam']['stats']['FumLost']['#text'])
-                game_stats['fumblesRecovered'] = int(game['awayTeam']['stats']['FumOppRec']['#text'])
-                game_stats['offense']['yardsGained'] = game['awayTeam']['stats']['OffenseYds']['#text']
-                game_stats['defense']['yardsAllowed'] = game['homeTeam']['stats']['OffenseYds']['#text']
-                game_stats['defense']['plays'] = int(game['homeTeam']['stats']['OffensePlays']['#text'])
-                # game_stats['defense']['third_down_attempts'] = int(game['homeTeam']['stats']['ThirdDownsAtt']['#text'])
-                # game_stats['defense']['third_down_conversions'] = int(game['homeTeam']['stats']['ThirdDowns']['#text'])
-                game_stats['defense']['1stQuarterPoints'] = int(game['quarter_summary']['quarter'][0]['homeScore'])
-                game_stats['offense']['1stQuarterPoints'] = int(game['quarter_summary']['quarter'][0]['awayScore'])
-                game_stats['defense']['2ndQuarterPoints'] = int(game['quarter_summary']['quarter'][1]['homeScore'])
-                game_stats['offense']['2ndQuarterPoints'] = int(game['quarter_summary']['quarter'][1]['awayScore'])
-                game_stats['defense']['3rdQuarterPoints'] = int(game['quarter_summary']['quarter'][2]['homeScore'])
-                game_stats['offense']['3rdQuarterPoints'] = int(game['quarter_summary']['quarter'][2]['awayScore'])
-                game_stats['defense']['4thQuarterPoints'] = int(game['quarter_summary']['quarter'][3]['homeScore'])
-                game_stats['offense']['4thQuarterPoints'] = int(game['quarter_summary']['quarter'][3]['awayScore'])
-            self.team_game_stats.append(game_stats)
+        self.team_game_stats = [GameStats.from_game(game, team) for game in self.team_game_results]
 
     @staticmethod
     def stat_trim(stat):
@@ -477,138 +763,48 @@ class NFLTeam(NFL):
             stat = stat[:6]
         return stat
 
-    async def parse_defensive_stats(self):
+    def load_season_columns(self):
+        self.season_columns = SeasonColumns.from_game_stats(self.team_game_stats)
+
+    def parse_season_stats(self):
         """
+        Set the team's season records, turnovers, defensive totals and points
+        by quarter from one vectorized pass over the game stats
+
         The Mysportsfeeds API doesn't provide totals for defensive plays and
-        yardage so this function parses them from the individual game stats
-        """
-        defense_plays = 0
-        defense_yards_allowed = 0  # noqa
-        # defense_third_down_attempts = 0  # noqa
-        # defense_third_down_conversions = 0  # noqa
-
-        for game in self.team_game_stats:
-            defense_plays += game['defense']['plays']
-            defense_yards_allowed += int(game['defense']['yardsAllowed'])  # noqa
-            # defense_third_down_attempts = int(game['defense']['third_down_attempts'])  # noqa
-            # defense_third_down_conversions = int(game['defense']['third_down_conversions'])  # noqa
-
-        self.defense_plays = defense_plays
-        self.total_yards_allowed = defense_yards_allowed
-        self.defense_yards_per_play = self.stat_trim(defense_yards_allowed / defense_plays)
-        self.defense_yards_per_game = self.stat_trim(defense_yards_allowed / len(self.team_game_stats))
-        # self.defense_third_down_attempts = defense_third_down_attempts
-        # self.defense_third_down_conversions = defense_third_down_conversions
-        # self.defense_third_down_percentage = self.stat_trim(defense_third_down_attempts / defense_third_down_attempts)
-
-    async def parse_turnovers(self):
-        turnovers = 0
-        takeaways = 0
-        for game in self.team_game_stats:
-            turnovers += game['interceptionsThrown']
-            turnovers += game['fumblesLost']
-            takeaways += game['fumblesRecovered']
-            takeaways += game['interceptions']
-        self.turnovers = turnovers
-        self.takeaways = takeaways
+        yardage so they're summed from the individual games
+        """
+        totals = {k: v[0] for k, v in self.season_columns.aggregate(teams=1).items()}
+        games = int(totals['games'])
+        self.road_record = f"{totals['road_wins']}-{totals['road_losses']}-{totals['road_ties']}"
+        self.home_record = f"{totals['home_wins']}-{totals['home_losses']}-{totals['home_ties']}"
+        self.turnovers = int(totals['turnovers'])
+        self.takeaways = int(totals['takeaways'])
         self.turnover_diff = self.takeaways - self.turnovers
+        self.defense_plays = int(totals['plays_allowed'])
+        self.total_yards_allowed = int(totals['yards_allowed'])
+        self.defense_yards_per_play = self.stat_trim(self.total_yards_allowed / self.defense_plays)
+        self.defense_yards_per_game = self.stat_trim(self.total_yards_allowed / games)
+        (self.first_quarter_points_scored, self.second_quarter_points_scored,
+         self.third_quarter_points_scored, self.fourth_quarter_points_scored) = totals['quarters_for'].tolist()
+        (self.first_quarter_points_allowed, self.second_quarter_points_allowed,
+         self.third_quarter_points_allowed, self.fourth_quarter_points_allowed) = totals['quarters_against'].tolist()
 
-    async def parse_road_record(self):
-        """
-        Parse team's road wins and losses
-        """
-        road_wins = 0
-        road_losses = 0
-        road_ties = 0
-        for game in self.team_game_stats:
-            if game['gameType'] == 'roadGame':
-                if game['pointsFor'] > game['pointsAgainst']:
-                    road_wins += 1
-                elif game['pointsFor'] < game['pointsAgainst']:
-                    road_losses += 1
-                else:
-                    road_ties += 1
-        self.road_record = f"{road_wins}-{road_losses}-{road_ties}"
-
-    async def parse_home_record(self):
-        """
-        Parse team's road wins and losses
-        """
-        wins = 0
-        losses = 0
-        ties = 0
-        for game in self.team_game_stats:
-            if game['gameType'] == 'homeGame':
-                if game['pointsFor'] > game['pointsAgainst']:
-                    wins += 1
-                elif game['pointsFor'] < game['pointsAgainst']:
-                    losses += 1
-                else:
-                    ties += 1
-        self.home_record = f"{wins}-{losses}-{ties}"
-
-    async def offense_points_by_quarter(self):
-        """
-        Get total points scored in each quarter
-        """
-        first_quarter = []
-        second_quarter = []
-        third_quarter = []
-        fourth_quarter = []
-        for game in self.team_game_stats:
-            first_quarter.append(game['offense']['1stQuarterPoints'])
-            second_quarter.append(game['offense']['2ndQuarterPoints'])
-            third_quarter.append(game['offense']['3rdQuarterPoints'])
-            fourth_quarter.append(game['offense']['4thQuarterPoints'])
-        self.first_quarter_points_scored = sum(first_quarter)
-        self.second_quarter_points_scored = sum(second_quarter)
-        self.third_quarter_points_scored = sum(third_quarter)
-        self.fourth_quarter_points_scored = sum(fourth_quarter)
-
-    async def defense_points_by_quarter(self):
-        """
-        Get total points allowed in each quarter
-        """
-        first_quarter = []
-        second_quarter = []
-        third_quarter = []
-        fourth_quarter = []
-        for game in self.team_game_stats:
-            first_quarter.append(game['defense']['1stQuarterPoints'])
-            second_quarter.append(game['defense']['2ndQuarterPoints'])
-            third_quarter.append(game['defense']['3rdQuarterPoints'])
-            fourth_quarter.append(game['defense']['4thQuarterPoints'])
-        self.first_quarter_points_allowed = sum(first_quarter)
-        self.second_quarter_points_allowed = sum(second_quarter)
-        self.third_quarter_points_allowed = sum(third_quarter)
-        self.fourth_quarter_points_allowed = sum(fourth_quarter)
-
-    async def parse_games(self):
+    def parse_games(self):
         """
         From an NFL team's schedule separate games that have been completed and
         games that haven't been played yet
         """
-        for game in self.schedule:
-            game_date = datetime.datetime.strptime(game['date'], "%Y-%m-%d")
-            if self.date > game_date:
-                self.played_games.append(game)
-            else:
-                self.unplayed_games.append(game)
+        index = ScheduleIndex(self.schedule)
+        position = index.split(self.date)
+        self.played_games = list(index.games[:position])
+        self.unplayed_games = list(index.games[position:])
 
-    def fetch_team_stats(self):
+    def fetch_team_stats(self, season='current'):
         """
         Get team stats from Mysportsfeeds API
         """
-        stats = self.check_data_cache('nfl_team_stats.json')
-        if stats:
-            return stats
-        url = f"{self.base_url}current/division_team_standings.json"
-        data = self.api_request(url)
-        stats = data['divisionteamstandings']
-        stats['timestamp'] = int(datetime.datetime.now().timestamp())
-        with open('stats_cache/team_stats.json', 'w+') as stats_file:
-            stats_file.write(json.dumps(stats, indent=2))
-        return stats
+        return super().fetch_team_stats(season)
 
     def parse_stats(self, team_abbreviation):
         stats = self.fetch_team_stats()
@@ -627,13 +823,44 @@ class NFLTeam(NFL):
         return filtered_stats
 
 
+def compare_data_paths(team):
+    """
+    Build a team with the boxscore and bulk data paths and return the games
+    whose parsed stats differ
+    """
+    by_boxscore = NFLTeam(team)
+    by_bulk = NFLTeam(team, data_path='bulk')
+    try:
+        boxscore_games = {(i.week, i.opponent): i for i in by_boxscore.team_game_stats}
+        bulk_games = {(i.week, i.opponent): i for i in by_bulk.team_game_stats}
+    finally:
+        by_boxscore.close()
+        by_bulk.close()
+    differences = {}
+    for key in set(boxscore_games) | set(bulk_games):
+        if boxscore_games.get(key) != bulk_games.get(key):
+            differences[key] = (boxscore_games.get(key), bulk_games.get(key))
+    return differences
+
+
+def league_season_stats(teams):
+    """
+    Return season totals for several NFLTeam objects from one vectorized pass
+    """
+    teams = list(teams)
+    columns = SeasonColumns.concatenate(team.season_columns for team in teams)
+    totals = columns.aggregate(teams=len(teams))
+    return {team.team: {k: v[i] for k, v in totals.items()} for i, team in enumerate(teams)}
+
+
 class NFLPlayer(NFL):
     """
     Create NFL player object
     """
-    def __init__(self, player, season=None):
-        super().__init__(self, player)
+    def __init__(self, player, season=None, **kwargs):
+        super().__init__(**kwargs)
         self.player = player
+        self.player_season = season
 
     def get_season_game_stats(self):
         """
@@ -661,7 +888,7 @@ def main():
         "Authorization": f"Basic {byte_string.decode('ascii')}"
     }
     url = 'https://api.mysportsfeeds.com/v2.0/pull/nfl/2018-regular/date/20181126/games.json'
-    req = requests.get(url, headers=headers, verify=False)
+    req = requests.get(url, headers=headers, verify=False, timeout=HTTP_TIMEOUT)
     print(req.status_code)
     print(json.dumps(req.json(), indent=2))
 
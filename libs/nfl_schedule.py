@@ -0,0 +1,87 @@
+import bisect
+import datetime
+
+
+def date_ordinal(date):
+    """
+    Return the ordinal of a Mysportsfeeds "YYYY-MM-DD" date
+    """
+    return datetime.date.fromisoformat(date).toordinal()
+
+
+class ScheduleIndex:
+    """
+    NFL schedule parsed once into date ordinals with week and team indexes
+
+    Games are held sorted by date, weeks and teams map to the sorted
+    positions of their games so every lookup is a dict access or a bisect
+    """
+    def __init__(self, schedule):
+        dated = sorted((date_ordinal(game['date']), i, game) for i, game in enumerate(schedule))
+        self.games = tuple(i[2] for i in dated)
+        self.ordinals = [i[0] for i in dated]
+        self.weeks = {}
+        self.teams = {}
+        for position, game in enumerate(self.games):
+            self.weeks.setdefault(game['week'], []).append(position)
+            for side in ('homeTeam', 'awayTeam'):
+                self.teams.setdefault(game[side]['Abbreviation'], []).append(position)
+
+    def __len__(self):
+        return len(self.games)
+
+    def split(self, date):
+        """
+        Return the position of the first game that isn't played by date
+
+        Games are dated at midnight, so a game on date is only unplayed if
+        date is exactly midnight
+        """
+        ordinal = date.toordinal()
+        if date == datetime.datetime.combine(date.date(), datetime.time()):
+            return bisect.bisect_left(self.ordinals, ordinal)
+        return bisect.bisect_right(self.ordinals, ordinal)
+
+    def upcoming_week(self, date):
+        """
+        Return the week of the first game on or after date
+        """
+        position = self.split(date)
+        if position < len(self.games):
+            return self.games[position]['week']
+
+    def week_games(self, week):
+        """
+        Return the games of a given week
+        """
+        return [self.games[i] for i in self.weeks.get(week, ())]
+
+    def team_games(self, team):
+        """
+        Return a team's games by abbreviation
+        """
+        return [self.games[i] for i in self.teams.get(team.upper(), ())]
+
+    def played_split(self, week, date):
+        """
+        Return a week's games split into played and unplayed by date
+        """
+        positions = self.weeks.get(week, [])
+        cut = bisect.bisect_left(positions, self.split(date))
+        return (
+            [self.games[i] for i in positions[:cut]],
+            [self.games[i] for i in positions[cut:]]
+        )
+
+    def current_games(self, date):
+        """
+        Return the games played so far in the upcoming week, or all of last
+        week's games if none have been played yet
+        """
+        week = self.upcoming_week(date)
+        if not week:
+            return []
+        played = self.played_split(week, date)[0]
+        if played:
+            return played
+        return self.week_games(str(int(week) - 1))
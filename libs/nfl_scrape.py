@@ -1,27 +1,19 @@
+import concurrent.futures
 import datetime
 import json
-import os
+import logging
 import requests
-import socket
-import time
+import threading
 
 from bs4 import BeautifulSoup
 
-# from utils.helpers import get_config
-def get_config(config_file):
-    """
-    Get configuration for command
-    :return:
-    """
-    with open('/jalbot/config/{}'.format(config_file), 'r') as f:
-        config = json.load(f)
-    if 'env' not in config.keys():
-        config['env'] = None
-    if config['env']:
-        for env_var in config['env']:
-            config[env_var] = os.environ[env_var]
-        del config['env']
-    return config
+from utils.helpers import HTTP_TIMEOUT, get_config, http_session
+from utils.singleflight import FLIGHTS
+from utils.stats_cache import STATS_CACHE
+
+REFRESH_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix='nfl-scrape')
+REFRESHING = set()
+REFRESHING_LOCK = threading.Lock()
 
 
 class NFLScrapeException(Exception):
@@ -40,7 +32,9 @@ class NFLScrape:
         self.base_url = 'https://www.pro-football-reference.com/teams/{}/{}.htm#games::none'
         self.season = season
         self.date = datetime.datetime.now()
-        self.stats = self.parse_stats()
+        self.cache = STATS_CACHE
+        self.stale_age = None
+        self.stats = self.cached_stats()
 
     @property
     def current_season(self):
@@ -54,17 +48,12 @@ class NFLScrape:
         """
         Retrieve the page content from pro-football-reference.com
         """
-        if not self.season:
-            season = self.current_season
+        season = self.season or self.current_season
         url = self.base_url.format(self.team_abbreviation, season)
         try:
-            request = requests.get(url)
-        except (socket.gaierror, requests.exceptions.ConnectionError):
-            time.sleep(2)
-            try:
-                request = requests.get(url)
-            except requests.exceptions.ConnectionError as err:
-                raise NFLScrapeException(f"Error connecting to server: {err}")
+            request = http_session().get(url, timeout=HTTP_TIMEOUT)
+        except requests.exceptions.RequestException as err:
+            raise NFLScrapeException(f"Error connecting to server: {err}")
         if request.status_code != 200:
             error = f"Error requesting page content: {request.status_code}"
             raise NFLScrapeException(error)
@@ -102,6 +91,47 @@ class NFLScrape:
         elif header.text == 'Lg Rank Offense':
             return 'offense_rank'
 
+    def cached_stats(self):
+        """
+        Return the team's scraped stats from the stats cache
+
+        Expired stats are served while the page is scraped again in the
+        background, the page is only scraped before replying if the team's
+        stats were never cached
+        """
+        key = f"{self.team_abbreviation}_{self.season or self.current_season}"
+        stats = self.cache.get('nfl_scrape', key)
+        if stats is not None:
+            return stats
+        expired = self.cache.stale('nfl_scrape', key)
+        if expired is None:
+            return FLIGHTS.do(('nfl_scrape', key), self.scrape_stats, key)
+        stats, self.stale_age = expired
+        with REFRESHING_LOCK:
+            if key not in REFRESHING:
+                REFRESHING.add(key)
+                REFRESH_POOL.submit(self.refresh_stats, key)
+        return stats
+
+    def refresh_stats(self, key):
+        """
+        Scrape expired stats again, keeping the expired stats on errors
+        """
+        try:
+            FLIGHTS.do(('nfl_scrape', key), self.scrape_stats, key)
+        except Exception as err:
+            logging.error(f"NFL scrape refresh failed, serving expired stats | {key} | {err}")
+        finally:
+            with REFRESHING_LOCK:
+                REFRESHING.discard(key)
+
+    def scrape_stats(self, key):
+        stats = self.cache.get('nfl_scrape', key)
+        if stats is None:
+            stats = self.parse_stats()
+            self.cache.set('nfl_scrape', key, stats)
+        return stats
+
     def parse_stats(self):
         stats = self.scrape_content
         stats_list = stats.find_all('td')
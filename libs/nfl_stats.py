@@ -0,0 +1,146 @@
+import collections
+
+import numpy as np
+
+
+QUARTERS = 4
+COLUMNS = (
+    'points_for', 'points_against', 'interceptions_thrown', 'interceptions', 'fumbles_lost',
+    'fumbles_recovered', 'yards_gained', 'yards_allowed', 'plays_allowed'
+)
+
+
+class GameStats(collections.namedtuple('GameStats', [
+        'week', 'date', 'time', 'home', 'opponent', 'points_for', 'points_against',
+        'interceptions_thrown', 'interceptions', 'fumbles_lost', 'fumbles_recovered',
+        'yards_gained', 'yards_allowed', 'plays_allowed', 'quarters_for', 'quarters_against'])):
+    """
+    One team's stats for one game with integer fields
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_game(cls, game, team):
+        """
+        Extract a team's stats from a game with boxscore results, the same
+        way for home and road games
+        """
+        home = game['homeTeam']['Abbreviation'] == team
+        if home:
+            side, other, score, opponent_score = 'homeTeam', 'awayTeam', 'homeScore', 'awayScore'
+        else:
+            side, other, score, opponent_score = 'awayTeam', 'homeTeam', 'awayScore', 'homeScore'
+        stats = game[side]['stats']
+        opponent_stats = game[other]['stats']
+        quarters = game['quarter_summary']['quarter'][:QUARTERS]
+        return cls(
+            game['week'],
+            game['date'],
+            game['time'],
+            home,
+            game[other]['Abbreviation'],
+            int(stats['PointsFor']['#text']),
+            int(stats['PointsAgainst']['#text']),
+            int(stats['PassInt']['#text']),
+            int(stats['Interceptions']['#text']),
+            int(stats['FumLost']['#text']),
+            int(stats['FumOppRec']['#text']),
+            int(stats['OffenseYds']['#text']),
+            int(opponent_stats['OffenseYds']['#text']),
+            int(opponent_stats['OffensePlays']['#text']),
+            tuple([int(i[score]) for i in quarters]),
+            tuple([int(i[opponent_score]) for i in quarters])
+        )
+
+
+class SeasonColumns:
+    """
+    Per game team stats held as NumPy columns, one row per game
+
+    A team id column lets the games of every team be stacked into one set of
+    columns so league wide aggregates take the same single pass as a team's
+    """
+    def __init__(self, columns, home, quarters_for, quarters_against, team_ids=None):
+        self.columns = columns
+        self.home = home
+        self.quarters_for = quarters_for
+        self.quarters_against = quarters_against
+        if team_ids is None:
+            team_ids = np.zeros(len(home), dtype=np.intp)
+        self.team_ids = team_ids
+
+    def __len__(self):
+        return len(self.home)
+
+    @classmethod
+    def from_game_stats(cls, team_game_stats, team_id=0):
+        """
+        Build columns from NFLTeam.team_game_stats GameStats records
+        """
+        count = len(team_game_stats)
+        values = np.array(
+            [[getattr(game, i) for i in COLUMNS] for game in team_game_stats], dtype=np.int64
+        ).reshape(count, len(COLUMNS))
+        quarters_for = np.array(
+            [game.quarters_for for game in team_game_stats], dtype=np.int64
+        ).reshape(count, QUARTERS)
+        quarters_against = np.array(
+            [game.quarters_against for game in team_game_stats], dtype=np.int64
+        ).reshape(count, QUARTERS)
+        home = np.array([game.home for game in team_game_stats], dtype=bool)
+        columns = dict(zip(COLUMNS, values.T))
+        return cls(columns, home, quarters_for, quarters_against, np.full(count, team_id, dtype=np.intp))
+
+    @classmethod
+    def concatenate(cls, seasons):
+        """
+        Stack several teams' columns, numbering the teams in order
+        """
+        seasons = list(seasons)
+        columns = {i: np.concatenate([season.columns[i] for season in seasons]) for i in COLUMNS}
+        return cls(
+            columns,
+            np.concatenate([season.home for season in seasons]),
+            np.concatenate([season.quarters_for for season in seasons]),
+            np.concatenate([season.quarters_against for season in seasons]),
+            np.concatenate([np.full(len(season), i, dtype=np.intp) for i, season in enumerate(seasons)])
+        )
+
+    def aggregate(self, teams=None):
+        """
+        Return every season total per team, as arrays indexed by team id
+        """
+        teams = teams or int(self.team_ids.max(initial=-1)) + 1
+        ids = self.team_ids
+
+        def total(values):
+            return np.bincount(ids, weights=values, minlength=teams).astype(np.int64)
+
+        c = self.columns
+        won = c['points_for'] > c['points_against']
+        lost = c['points_for'] < c['points_against']
+        tied = ~(won | lost)
+        road = ~self.home
+        totals = {
+            'games': np.bincount(ids, minlength=teams),
+            'home_wins': total(won & self.home),
+            'home_losses': total(lost & self.home),
+            'home_ties': total(tied & self.home),
+            'road_wins': total(won & road),
+            'road_losses': total(lost & road),
+            'road_ties': total(tied & road),
+            'turnovers': total(c['interceptions_thrown'] + c['fumbles_lost']),
+            'takeaways': total(c['interceptions'] + c['fumbles_recovered']),
+            'yards_gained': total(c['yards_gained']),
+            'yards_allowed': total(c['yards_allowed']),
+            'plays_allowed': total(c['plays_allowed']),
+            'points_for': total(c['points_for']),
+            'points_against': total(c['points_against'])
+        }
+        quarters_for = np.zeros((teams, QUARTERS), dtype=np.int64)
+        quarters_against = np.zeros((teams, QUARTERS), dtype=np.int64)
+        np.add.at(quarters_for, ids, self.quarters_for)
+        np.add.at(quarters_against, ids, self.quarters_against)
+        totals['quarters_for'] = quarters_for
+        totals['quarters_against'] = quarters_against
+        return totals
@@ -0,0 +1,73 @@
+import datetime
+
+from utils.stats_cache import STATS_CACHE
+
+
+NAMESPACE = 'nfl_boxscores'
+# A game is treated as final once this long has passed since midnight of
+# its scheduled date, late kickoffs plus overtime end well inside it
+FINAL_AFTER = datetime.timedelta(hours=36)
+QUARTERS = 4
+
+
+class BoxscoreStore:
+    """
+    Persistent store of boxscores for completed NFL games
+
+    Final boxscores never change so a stored game is never requested from
+    Mysportsfeeds again. Games that are unplayed or may still be in progress
+    are never stored, a game must be past its scheduled date and its
+    boxscore must show it completed. Boxscores are kept in the stats cache's
+    nfl_boxscores namespace, one file per game.
+    """
+    def __init__(self, cache=STATS_CACHE):
+        self.cache = cache
+
+    @staticmethod
+    def is_final(game, now=None):
+        """
+        Return True if a schedule entry's game has certainly finished
+        """
+        now = now or datetime.datetime.now()
+        game_date = datetime.datetime.strptime(game['date'], "%Y-%m-%d")
+        return game_date + FINAL_AFTER <= now
+
+    @staticmethod
+    def is_complete(data):
+        """
+        Return True if a boxscore payload shows its game completed
+
+        Completion flags are used when the payload has them, otherwise every
+        regulation quarter and the final totals must be present, which a
+        postponed or unplayed game's boxscore doesn't have
+        """
+        boxscore = data.get('gameboxscore') or {}
+        for flags in (boxscore, boxscore.get('game') or {}):
+            if 'isCompleted' in flags:
+                return flags['isCompleted'] in (True, 'true')
+            if 'playedStatus' in flags:
+                return flags['playedStatus'] == 'COMPLETED'
+        summary = boxscore.get('quarterSummary') or {}
+        quarters = summary.get('quarter')
+        if not isinstance(quarters, list) or len(quarters) < QUARTERS:
+            return False
+        return bool(summary.get('quarterTotals'))
+
+    def get(self, season, game_id):
+        """
+        Return the stored boxscore for a game or None
+        """
+        return self.cache.get(NAMESPACE, f"{season}/{game_id}")
+
+    def put(self, season, game_id, data):
+        """
+        Store a completed game's boxscore
+        """
+        self.cache.set(NAMESPACE, f"{season}/{game_id}", data)
+
+    @property
+    def stats(self):
+        return self.cache.stats.get(NAMESPACE, {})
+
+
+BOXSCORES = BoxscoreStore()
@@ -1,18 +1,18 @@
+import aiohttp
 import slackclient
 import logging
+import json
 import time
 import traceback
-import os
 import requests
-import importlib
-import inspect
-import sys
 import asyncio
 
-from socket import gaierror
-from threading import Thread
-
+from libs.slack_dispatch import SlackDispatcher
+from libs.slack_filter import EventFilter
+from utils.cache import TTLCache
+from utils.registry import CommandRegistry
 from utils.helpers import get_config, log_command
+from utils.scheduler import CommandScheduler
 from utils.exceptions import JockBotException
 from utils.exceptions import NFLRequestException
 from utils.exceptions import NHLException
@@ -21,6 +21,11 @@ from utils.exceptions import NBAException
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
 requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 
+RTM_HEARTBEAT = 30
+RTM_BACKOFF = (1, 2, 4, 8, 16, 30)
+RTM_STABLE = 60
+SPINNING_DELAY = 1.5
+
 
 class Slack(object):
     def __init__(self, token):
@@ -32,7 +37,18 @@ class Slack(object):
         """
         self.config = get_config('slack.json')
         self.client = slackclient.SlackClient(token)
-        self.commands = self.load_commands('/jockbot/commands/')
+        self.commands = CommandRegistry('/jockbot/commands/',
+                                        aliases=self.config["commands"]["alt_names"])
+        identity_cache = self.config.get('identity_cache', {})
+        self.identities = TTLCache(maxsize=identity_cache.get('maxsize', 5000),
+                                   ttl=identity_cache.get('ttl', 3600))
+        self.event_filter = EventFilter(self.config["bot_names"], self.config.get("channels"))
+        self.scheduler = CommandScheduler(**self.config.get('scheduler', {}))
+        outbound = self.config.get('outbound', {})
+        self.spinning_delay = outbound.get('spinning_delay', SPINNING_DELAY)
+        self.outbound = SlackDispatcher(self.client,
+                                        workers=outbound.get('workers', 2),
+                                        rate_limits=outbound.get('rate_limits'))
 
     def post_message(self, channel, message):
         """
@@ -43,15 +59,15 @@ class Slack(object):
         :return:
         """
         if isinstance(message, dict):
-            self.client.api_call("chat.postMessage",
-                                 channel=channel,
-                                 attachments=[message],
-                                 as_user=True)
+            self.outbound.call("chat.postMessage",
+                               channel,
+                               attachments=[message],
+                               as_user=True)
         else:
-            self.client.api_call("chat.postMessage",
-                                 channel=channel,
-                                 text=message,
-                                 as_user=True)
+            self.outbound.call("chat.postMessage",
+                               channel,
+                               text=message,
+                               as_user=True)
 
     def post_reaction(self, emoji, ts, channel):
         """
@@ -61,10 +77,10 @@ class Slack(object):
         :param message:
         :return:
         """
-        self.client.api_call("reactions.add",
-                             name=emoji,
-                             timestamp=ts,
-                             channel=channel)
+        self.outbound.call("reactions.add",
+                           channel,
+                           name=emoji,
+                           timestamp=ts)
 
     def del_reaction(self, emoji, msg_id, channel):
         """
@@ -74,98 +90,174 @@ class Slack(object):
         :param message:
         :return:
         """
-        self.client.api_call("reactions.remove",
-                             name=emoji,
-                             timestamp=msg_id,
-                             channel=channel)
+        self.outbound.call("reactions.remove",
+                           channel,
+                           name=emoji,
+                           timestamp=msg_id)
 
     def user_info(self, user_id):
         """
-        Post the provided message to the given channel
+        Return users.info for the given user, cached in the identity cache
 
-        :param channel:
-        :param message:
+        :param user_id:
         :return:
         """
+        info = self.identities.get(('user', user_id))
+        if info:
+            return info
         info = self.client.api_call("users.info", user=user_id)
+        if info.get("ok"):
+            self.identities.set(('user', user_id), info)
         return info
 
     def channel_info(self, channel_id):
         """
-        Post the provided message to the given channel
+        Return channels.info for the given channel, cached in the identity cache
 
-        :param channel:
-        :param message:
+        :param channel_id:
         :return:
         """
+        info = self.identities.get(('channel', channel_id))
+        if info:
+            return info
         info = self.client.api_call("channels.info", channel=channel_id)
         if not info["ok"]:
             info = None
+        else:
+            self.identities.set(('channel', channel_id), info)
         return info
 
-    @staticmethod
-    def slack_worker(loop):
+    def warm_identities(self):
         """
-        Slack event loop
+        Fill the identity cache from users.list so first commands don't wait
+        on users.info
         """
-        asyncio.set_event_loop(loop)
-        loop.run_forever()
+        cursor = None
+        while True:
+            response = self.client.api_call("users.list", limit=200, cursor=cursor)
+            if not response.get("ok"):
+                logging.error(f"users.list failed: {response.get('error')}")
+                break
+            for member in response["members"]:
+                self.identities.set(('user', member["id"]), {"ok": True, "user": member})
+            cursor = response.get("response_metadata", {}).get("next_cursor")
+            if not cursor:
+                break
+        logging.info(f"Identity cache warmed | {self.identities.stats}")
+
+    async def rtm_url(self):
+        """
+        Request a websocket URL from the Slack rtm.connect method
+        """
+        loop = asyncio.get_event_loop()
+        response = await loop.run_in_executor(None, self.client.api_call, "rtm.connect")
+        if not response.get("ok"):
+            raise ConnectionError(f"rtm.connect failed: {response.get('error')}")
+        return response["url"]
+
+    async def rtm_listen(self):
+        """
+        Read events from the Slack RTM websocket until the connection drops
+        """
+        url = await self.rtm_url()
+        async with aiohttp.ClientSession() as session:
+            async with session.ws_connect(url, heartbeat=RTM_HEARTBEAT) as ws:
+                logging.info('Connected to Slack')
+                if not len(self.identities):
+                    asyncio.get_event_loop().run_in_executor(None, self.warm_identities)
+                self.commands.preload(self.config["commands"].get("preload", []))
+                async for msg in ws:
+                    if msg.type != aiohttp.WSMsgType.TEXT:
+                        break
+                    try:
+                        event = json.loads(msg.data)
+                        if event.get('type') == 'goodbye':
+                            logging.info('Slack sent goodbye, reconnecting')
+                            break
+                        self.dispatch_event(event)
+                    except Exception as err:
+                        logging.error(f'Error handling Slack event | {err}\n{traceback.format_exc()}')
+        logging.info(f'Slack connection closed | events: {self.event_filter.stats}')
+
+    def dispatch_event(self, event):
+        """
+        Schedule a task for Slack events that contain a bot command
+        """
+        if not self.event_filter.accept(event):
+            return
+        bot_text = self.get_bot_command(event["text"])
+        if not bot_text:
+            return
+        command, event["text"] = bot_text
+        if not self.scheduler.submit(event["channel"], self.run_command, command, event):
+            self.post_busy(event)
+
+    def run_command(self, command, event):
+        """
+        Run a bot command on a scheduler worker thread
+
+        The spinning reaction is deferred so it is never sent for commands
+        that reply within spinning_delay seconds, or that fail without
+        replying
+        """
+        self.outbound.defer(("spinning", event["ts"]),
+                            self.spinning_delay,
+                            "reactions.add",
+                            event["channel"],
+                            name="spinning",
+                            timestamp=event["ts"])
+        try:
+            self.handle_message(command, event)
+        finally:
+            self.outbound.cancel(("spinning", event["ts"]))
+
+    def post_busy(self, event):
+        """
+        Tell the channel the command was dropped because the bot is saturated
+        """
+        response = ':red_dot: _*JockBot is busy*_```Too many commands queued, try again shortly```'
+        self.post_message(event["channel"], response)
+        self.post_reaction("hourglass", event["ts"], event["channel"])
+
+    async def rtm_loop(self):
+        """
+        Keep the RTM connection open, backing off between reconnects
+
+        The backoff grows for errors, including unexpected ones which are
+        logged with their traceback, and for connections the server closes
+        quickly, and resets once a connection has stayed up for RTM_STABLE
+        seconds
+        """
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                await self.rtm_listen()
+            except (aiohttp.ClientError, requests.exceptions.RequestException,
+                    asyncio.TimeoutError, OSError) as err:
+                logging.error(f'Slack connection error: {err}')
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception('Unexpected error in Slack connection')
+            if time.monotonic() - started >= RTM_STABLE:
+                attempt = 0
+            delay = RTM_BACKOFF[min(attempt, len(RTM_BACKOFF) - 1)]
+            logging.info(f'Reconnecting to Slack in {delay}s')
+            attempt += 1
+            await asyncio.sleep(delay)
 
     def api_connect(self):
         """
         Connect to Slack Real Time Messaging API
         :return:
         """
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
         try:
-            client = self.client.rtm_connect()
-        except gaierror:
-            time.sleep(1)
-            client = self.client.rtm_connect()
-        if client:
-            logging.info('Connected to Slack')
-            worker_loop = asyncio.new_event_loop()
-            worker = Thread(target=self.slack_worker, args=(worker_loop, ))
-            worker.start()
-            while True:
-                try:
-                    events = self.client.rtm_read()
-                except Exception as err:
-                    time.sleep(1)
-                    events = self.client.rtm_read()
-                for event in events:
-                    try:
-                        if event.get('text'):
-                            bot_text = self.get_bot_command(event["text"])
-                            if bot_text:
-                                event["text"] = bot_text[1]
-                                command = bot_text[0]
-                                self.post_reaction("spinning", event["ts"], event["channel"])
-                                worker_loop.run_in_executor(None, self.handle_message, command, event)
-                    except requests.exceptions.ConnectionError as err:
-                        logging.error('Connection Error')
-                        time.sleep(2)
-                        self.client.rtm_connect()
-                        self.post_reaction("spinning", event["ts"], event["channel"])
-                        worker_loop.run_in_executor(None, self.handle_message, command, event)
-
-    @staticmethod
-    def load_commands(command_path):
-        """
-        Load commands
-        """
-        logging.info("Loading bot commands")
-        sys.path.append(command_path)
-
-        commands = {}
-        for command in os.listdir(command_path):
-            if not command.startswith('_'):
-                cmd = importlib.import_module(command[:-3])
-                cmd_funcs = dict(inspect.getmembers(cmd, inspect.isclass))
-                cmd_func = cmd_funcs.get('BotCommand')
-                cmd_name = repr(cmd_func).strip('<class ').strip('>')
-                logging.info('LOADING %s' % (cmd_name))
-                commands[command[:-3]] = cmd_func
-        return commands
+            loop.run_until_complete(self.rtm_loop())
+        finally:
+            loop.close()
 
     def get_bot_command(self, text=None):
         """
@@ -188,7 +280,8 @@ class Slack(object):
         Post reply to Slack and add command complete emoji
         """
         self.post_message(event["channel"], response)
-        self.del_reaction("spinning", event["ts"], event["channel"])
+        if not self.outbound.cancel(("spinning", event["ts"])):
+            self.del_reaction("spinning", event["ts"], event["channel"])
         self.post_reaction(emoji, event["ts"], event["channel"])
         return
 
@@ -196,9 +289,13 @@ class Slack(object):
         """
         Return the correct module for the requested command
         """
-        if command in self.config["commands"]["alt_names"].keys():
-            command = self.config["commands"]["alt_names"][command]
-        func = self.commands.get(command)
+        try:
+            func = self.commands.get(command)
+        except Exception as err:
+            logging.error(f'Error loading command {command} | {err}\n{traceback.format_exc()}')
+            response = f':red_dot: _*JockBot Error*_```Unable to load command: {command}```'
+            self.post_to_slack(response, event, 'x')
+            return
         if not func:
             response = f':red_dot: _*JockBot Error*_```Unknown Command: {command}```'
             self.post_to_slack(response, event, 'x')
@@ -213,6 +310,8 @@ class Slack(object):
         """
         user = self.user_info(event["user"])
         func = self.get_func(command, event)
+        if not func:
+            return
         try:
             bot_command = func(event, user)
             response = bot_command.run_cmd()
@@ -241,10 +340,4 @@ class Slack(object):
             ]
             self.post_to_slack("\n".join(response), event, 'skull_and_crossbones')
             return
-        try:
-            self.post_to_slack(response, event, 'robot_face')
-        except Exception as err:
-            logging.error(f'ERROR POSTING TO SLACK API: {err}')
-            time.sleep(1)
-            self.client.rtm_connect()
-            self.post_message(event["channel"], response)
+        self.post_to_slack(response, event, 'robot_face')
@@ -0,0 +1,235 @@
+import collections
+import heapq
+import itertools
+import logging
+import threading
+import time
+import traceback
+
+
+# Calls per minute allowed for each Slack Web API method. reactions.add is
+# a tier 3 method, reactions.remove is tier 2 and chat.postMessage is limited
+# to roughly one message per second per channel.
+RATE_LIMITS = {
+    'chat.postMessage': 60,
+    'reactions.add': 50,
+    'reactions.remove': 20
+}
+PER_CHANNEL_METHODS = ('chat.postMessage',)
+MAX_ATTEMPTS = 3
+# Seconds before a call that failed to reach Slack is tried again
+ERROR_DELAY = 1
+
+
+class SlackCall:
+    """
+    A queued Slack Web API call
+    """
+    __slots__ = ('method', 'channel', 'kwargs', 'attempts', 'not_before')
+
+    def __init__(self, method, channel, kwargs):
+        self.method = method
+        self.channel = channel
+        self.kwargs = kwargs
+        self.attempts = 0
+        self.not_before = 0
+
+
+class RateLimiter:
+    """
+    Token buckets keyed by Slack method, or method and channel
+    """
+    def __init__(self, limits):
+        self.limits = limits
+        self.buckets = {}
+        self.blocked_until = {}
+
+    def delay(self, key, now):
+        """
+        Take a token for key and return 0, or return the seconds until one is
+        available
+        """
+        blocked = self.blocked_until.get(key[0], 0) - now
+        if blocked > 0:
+            return blocked
+        per_minute = self.limits.get(key[0])
+        if not per_minute:
+            return 0
+        rate = per_minute / 60.0
+        capacity = max(1.0, per_minute / 10.0)
+        tokens, updated = self.buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        if tokens < 1:
+            self.buckets[key] = (tokens, now)
+            return (1 - tokens) / rate
+        self.buckets[key] = (tokens - 1, now)
+        return 0
+
+    def block(self, method, seconds, now):
+        """
+        Stop sending a method until Slack's Retry-After has passed
+        """
+        self.blocked_until[method] = max(self.blocked_until.get(method, 0), now + seconds)
+
+
+class SlackDispatcher:
+    """
+    Send Slack Web API calls from background threads
+
+    Calls are queued per channel and sent in order, one at a time per
+    channel, while staying inside Slack's rate limits. Deferred calls are
+    held back for a delay and can be cancelled before they are sent, which
+    lets quick replies skip the spinning reaction entirely.
+
+    A ratelimited response blocks its method on every channel until
+    Slack's Retry-After has passed. A call that fails to reach Slack is
+    retried on its own after error_delay, holding back only its channel.
+    """
+    def __init__(self, client, workers=2, rate_limits=None, error_delay=ERROR_DELAY):
+        self.client = client
+        self.error_delay = error_delay
+        self.limiter = RateLimiter(rate_limits or RATE_LIMITS)
+        self.channels = collections.OrderedDict()
+        self.busy = set()
+        self.deferred = []
+        self.deferred_keys = {}
+        self.sequence = itertools.count()
+        self.counters = collections.Counter()
+        self.condition = threading.Condition()
+        self.threads = []
+        for i in range(int(workers)):
+            thread = threading.Thread(target=self._worker, name=f'slack-dispatch-{i}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def call(self, method, channel, **kwargs):
+        """
+        Queue a Slack API call for the given channel
+        """
+        with self.condition:
+            self._enqueue(SlackCall(method, channel, kwargs))
+            self.condition.notify()
+
+    def defer(self, key, delay, method, channel, **kwargs):
+        """
+        Queue a Slack API call that is only sent if not cancelled within delay
+        """
+        with self.condition:
+            due = time.monotonic() + delay
+            self.deferred_keys[key] = SlackCall(method, channel, kwargs)
+            heapq.heappush(self.deferred, (due, next(self.sequence), key))
+            self.condition.notify()
+
+    def cancel(self, key):
+        """
+        Cancel a deferred call, return False if it was already released
+        """
+        with self.condition:
+            call = self.deferred_keys.pop(key, None)
+            if call:
+                self.counters['elided'] += 1
+        return call is not None
+
+    def _enqueue(self, call, front=False):
+        calls = self.channels.get(call.channel)
+        if calls is None:
+            calls = self.channels[call.channel] = collections.deque()
+        if front:
+            calls.appendleft(call)
+        else:
+            calls.append(call)
+
+    def _release_deferred(self, now):
+        """
+        Move deferred calls that are due into their channel queues
+        """
+        while self.deferred and self.deferred[0][0] <= now:
+            due, _, key = heapq.heappop(self.deferred)
+            call = self.deferred_keys.pop(key, None)
+            if call:
+                self._enqueue(call)
+
+    def _next_call(self, now):
+        """
+        Return the next call that may be sent and the seconds to wait if none
+        """
+        wait = None
+        if self.deferred:
+            wait = self.deferred[0][0] - now
+        for channel in list(self.channels):
+            if channel in self.busy:
+                continue
+            calls = self.channels[channel]
+            call = calls[0]
+            if call.not_before > now:
+                delay = call.not_before - now
+                wait = delay if wait is None else min(wait, delay)
+                continue
+            if call.method in PER_CHANNEL_METHODS:
+                key = (call.method, channel)
+            else:
+                key = (call.method,)
+            delay = self.limiter.delay(key, now)
+            if delay:
+                wait = delay if wait is None else min(wait, delay)
+                continue
+            calls.popleft()
+            if calls:
+                self.channels.move_to_end(channel)
+            else:
+                del self.channels[channel]
+            return call, None
+        return None, wait
+
+    def _worker(self):
+        while True:
+            with self.condition:
+                while True:
+                    now = time.monotonic()
+                    self._release_deferred(now)
+                    call, wait = self._next_call(now)
+                    if call:
+                        break
+                    self.condition.wait(timeout=wait)
+                self.busy.add(call.channel)
+            outcome, retry_after = self._send(call)
+            with self.condition:
+                self.counters[outcome] += 1
+                self.busy.discard(call.channel)
+                if retry_after is not None and call.attempts < MAX_ATTEMPTS:
+                    if outcome == 'ratelimited':
+                        self.limiter.block(call.method, retry_after, time.monotonic())
+                    else:
+                        call.not_before = time.monotonic() + retry_after
+                    self._enqueue(call, front=True)
+                self.condition.notify_all()
+
+    def _send(self, call):
+        """
+        Send a call to Slack
+
+        Return the outcome and the seconds to wait if it should be retried
+        """
+        call.attempts += 1
+        try:
+            response = self.client.api_call(call.method, channel=call.channel, **call.kwargs)
+        except Exception as err:
+            logging.error(f'Slack API error | {call.method} | {err}\n{traceback.format_exc()}')
+            return 'errors', self.error_delay
+        if response.get('error') == 'ratelimited':
+            headers = response.get('headers', {})
+            retry_after = float(headers.get('Retry-After', 1))
+            logging.info(f'Slack rate limited | {call.method} | retry after {retry_after}s')
+            return 'ratelimited', retry_after
+        return 'sent', None
+
+    @property
+    def stats(self):
+        """
+        Return a snapshot of queued calls and counters
+        """
+        with self.condition:
+            stats = dict(self.counters)
+            stats['queued'] = sum(len(v) for v in self.channels.values())
+            stats['deferred'] = len(self.deferred_keys)
+        return stats
@@ -0,0 +1,43 @@
+import collections
+import re
+
+
+class EventFilter:
+    """
+    Cheap checks that drop Slack events which can't be bot commands before
+    any text is split or parsed
+    """
+    def __init__(self, bot_names, channels=None):
+        names = '|'.join(re.escape(i) for i in bot_names)
+        self.matcher = re.compile(rf'\s*(?:{names})\s+\S', re.IGNORECASE)
+        self.channels = frozenset(channels) if channels else None
+        self.counters = collections.Counter()
+
+    def accept(self, event):
+        """
+        Return True if the event is a message addressed to the bot
+        """
+        reason = self.drop_reason(event)
+        if reason:
+            self.counters[f'dropped_{reason}'] += 1
+            return False
+        self.counters['accepted'] += 1
+        return True
+
+    def drop_reason(self, event):
+        if event.get('type') != 'message':
+            return 'type'
+        if event.get('subtype'):
+            return 'subtype'
+        if event.get('bot_id') or not event.get('user'):
+            return 'bot'
+        if self.channels is not None and event.get('channel') not in self.channels:
+            return 'channel'
+        text = event.get('text')
+        if not text or not self.matcher.match(text):
+            return 'not_command'
+        return None
+
+    @property
+    def stats(self):
+        return dict(self.counters)
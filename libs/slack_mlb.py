@@ -6,7 +6,14 @@ from jockbot_mlb import MLB
 from jockbot_mlb import MLBTeam
 
 from utils.helpers import get_config
+from utils.data_context import DataContext, construction_stats
 from utils.exceptions import MLBException
+from utils.reply_cache import REPLIES, REPLY_TTLS, reply_key
+from utils.singleflight import FLIGHTS
+from utils.snapshots import age_note
+
+# League scores reply when there are no games today
+NO_GAMES_REPLY = ":mlb: *_No Scores Today*_"
 
 
 class SlackMLB:
@@ -20,7 +27,7 @@ class SlackMLB:
         self.player = player
         self.config = get_config('mlb.json')
         self.emojis = self.config['emojis']
-        self.mlb = MLB()
+        self.data = DataContext()
 
     @property
     def reply(self):
@@ -33,10 +40,44 @@ class SlackMLB:
             'stats': self.mlb_stats_reply,
             'standings': self.mlb_standings
         }
-        option = options.get(self.option)
+        key = reply_key('mlb', self.option, dict(self.args, team=self.team, player=self.player))
+        response = REPLIES.get(key)
+        if response is not None:
+            return response
+        return FLIGHTS.do(key, self._build_reply, key, options.get(self.option))
+
+    def _build_reply(self, key, option):
+        """
+        Build a reply and cache it unless it was built from stale data
+        """
         response = option()
+        logging.info(f"Reply data | {key} | {self.data.stats} | constructed {construction_stats()}")
+        if response and self.data.stale_age is not None:
+            response = f"{response}\n{age_note(self.data.stale_age)}"
+        elif response:
+            REPLIES.set(key, response, self.data.versions, self._reply_ttl())
         return response
 
+    def _reply_ttl(self):
+        """
+        Reuse replies briefly while games are live, longer otherwise
+
+        Game state is only read from objects the reply already loaded
+        """
+        if self.option == 'standings':
+            return REPLY_TTLS['standings']
+        for loaded in (self.data.loaded(('mlb', 'league')), self.data.loaded(('mlb', 'team', self.team))):
+            if loaded is not None and loaded.live_games:
+                return REPLY_TTLS['live']
+        return REPLY_TTLS['final']
+
+    @property
+    def mlb(self):
+        return self.data.get(('mlb', 'league'), MLB)
+
+    def _team(self):
+        return self.data.get(('mlb', 'team', self.team), lambda: MLBTeam(self.team))
+
     def mlb_scores_reply(self):
         if not self.team:
             reply = self._league_scores()
@@ -69,7 +110,7 @@ class SlackMLB:
 
     def _team_schedule(self, title=True, limit=None, type=None):
         """Format slack reply"""
-        team = MLBTeam(self.team)
+        team = self._team()
         games = team.remaining_games
         num_games = self.args.get('games')
         emoji = self.emojis.get(str(team.name))
@@ -87,7 +128,7 @@ class SlackMLB:
 
     def _league_schedule(self, title=True, limit=None, type=None):
         """Format slack reply"""
-        mlb = MLB()
+        mlb = self.mlb
         games = mlb.todays_games
         reply = [f":mlb: *Scheduled Games*"]
         for game in games:
@@ -96,7 +137,7 @@ class SlackMLB:
 
     def _team_scores(self, title=True, limit=None, type=None):
         """Format slack reply"""
-        team = MLBTeam(self.team)
+        team = self._team()
         games = team.played_games
         num_games = self.args.get('games')
         emoji = self.emojis.get(str(team.name))
@@ -113,10 +154,10 @@ class SlackMLB:
         return "\n".join(reply)
 
     def _league_scores(self):
-        mlb = MLB()
+        mlb = self.mlb
         games = mlb.todays_games
         if not games:
-            return f":mlb: *_No Scores Today*_"
+            return NO_GAMES_REPLY
         game_date = self._format_date(games[0]['date'])
         reply = [f":mlb: *{game_date}*"]
 
@@ -5,7 +5,16 @@ from jockbot_nhl import NHL
 from jockbot_nhl import NHLTeam
 
 from utils.helpers import get_config
+from utils.data_context import DataContext, construction_stats
 from utils.exceptions import NHLException
+from utils.reply_cache import REPLIES, REPLY_TTLS, reply_key
+from utils.singleflight import FLIGHTS
+from utils.snapshots import age_note
+
+NO_GAMES_YESTERDAY = ":nhl: *No Games Yesterday*"
+NO_GAMES_TODAY = ":nhl: *_No Games Today*_"
+# League scores reply when there are no recent, live or scheduled games
+NO_GAMES_REPLY = f"{NO_GAMES_YESTERDAY}\n{NO_GAMES_TODAY}"
 
 
 class SlackNHL:
@@ -19,7 +28,7 @@ class SlackNHL:
         self.player = player
         self.config = get_config('nhl_config.json')
         self.emojis = self.config['emojis']
-        self.nhl = NHL()
+        self.data = DataContext()
 
     @property
     def reply(self):
@@ -35,10 +44,49 @@ class SlackNHL:
             'career': self.nhl_career_stats,
             'standings': self.nhl_standings
         }
-        option = options.get(self.option)
+        key = reply_key('nhl', self.option, dict(self.args, team=self.team, player=self.player))
+        response = REPLIES.get(key)
+        if response is not None:
+            return response
+        return FLIGHTS.do(key, self._build_reply, key, options.get(self.option))
+
+    def _build_reply(self, key, option):
+        """
+        Build a reply and cache it unless it was built from stale data
+        """
         response = option()
+        logging.info(f"Reply data | {key} | {self.data.stats} | constructed {construction_stats()}")
+        if response and self.data.stale_age is not None:
+            response = f"{response}\n{age_note(self.data.stale_age)}"
+        elif response:
+            REPLIES.set(key, response, self.data.versions, self._reply_ttl())
         return response
 
+    def _reply_ttl(self):
+        """
+        Reuse replies briefly while games are live, longer otherwise
+
+        Game state is only read from objects the reply already loaded, a
+        team reply is treated as live on the day of the team's next game
+        """
+        if self.option == 'standings':
+            return REPLY_TTLS['standings']
+        nhl = self.data.loaded(('nhl', 'league'))
+        if nhl is not None and nhl.live_scores:
+            return REPLY_TTLS['live']
+        team = self.data.loaded(('nhl', 'team', self.team))
+        today = datetime.date.today().isoformat()
+        if team is not None and team.unplayed_games and team.unplayed_games[0]['date'].startswith(today):
+            return REPLY_TTLS['live']
+        return REPLY_TTLS['final']
+
+    @property
+    def nhl(self):
+        return self.data.get(('nhl', 'league'), NHL)
+
+    def _team(self):
+        return self.data.get(('nhl', 'team', self.team), lambda: NHLTeam(self.team))
+
     def nhl_scores_reply(self):
         if not self.team:
             reply = self.nhl_league_scores()
@@ -73,7 +121,7 @@ class SlackNHL:
         """
         Return slack reply with NHL stats
         """
-        team = NHLTeam(self.team)
+        team = self._team()
         emoji = self.emojis.get(str(team.team))
         team_stats = team.stats
         stats = team_stats['teamStats'][0]['splits'][0]['stat']
@@ -83,7 +131,7 @@ class SlackNHL:
         ot = stats['ot']
         points = stats['pts']
         last_three_games = self.nhl_team_scores(title=False, limit=3)
-        next_three_games = self.nhl_schedule(title=False, limit=3, type='unplayed')
+        next_three_games = self.nhl_team_schedule(title=False, limit=3, type='unplayed')
         reply = [
             f":{emoji}: *{team_stats['name']}*",
             f">*Venue: `{team.venue}`*",
@@ -163,7 +211,7 @@ class SlackNHL:
 
     def nhl_team_schedule(self, title=True, limit=None, type=None):
         """Format slack reply"""
-        team = NHLTeam(self.team)
+        team = self._team()
         games = team.unplayed_games
         num_games = self.args.get('games')
         emoji = self.emojis.get(str(team.name))
@@ -195,9 +243,9 @@ class SlackNHL:
 
     def nhl_league_schedule(self, title=True, limit=None, type=None):
         """Format slack reply"""
-        nhl = NHL()
+        nhl = self.nhl
         if not nhl.todays_games:
-            return f":nhl: *_No Games Today*_"
+            return NO_GAMES_TODAY
         games = nhl.todays_games['games']
         date = self._format_date(nhl.todays_games['date'])
         if not title:
@@ -259,7 +307,7 @@ class SlackNHL:
         return "\n".join(game_message)
 
     def nhl_league_scores(self):
-        nhl = NHL()
+        nhl = self.nhl
         recent_games = nhl.recent_scores
         live_games = nhl.live_scores
         reply = []
@@ -273,13 +321,13 @@ class SlackNHL:
             for game in recent_games:
                 reply.append(self._recent_game_reply(game))
         else:
-            reply.append(":nhl: *No Games Yesterday*")
+            reply.append(NO_GAMES_YESTERDAY)
         reply.append(self.nhl_league_schedule())
         return "\n".join(reply)
 
     def nhl_team_scores(self, title=True, limit=None):
         """Format slack reply"""
-        team = NHLTeam(self.team)
+        team = self._team()
         games = team.game_results
         emoji = self.emojis.get(str(team.team_id))
         num_games = self.args.get('games')
@@ -0,0 +1,129 @@
+"""
+Memory and throughput benchmark of GameStats against the nested dicts
+NFLTeam.parse_game_stats used to build, over several synthetic seasons
+
+Run from the repo root: python tests/bench_nfl_stats.py
+"""
+import os
+import random
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libs.nfl_stats import GameStats  # noqa
+
+TEAMS = [f"T{i:02d}" for i in range(32)]
+STATS = ('PointsFor', 'PointsAgainst', 'PassInt', 'Interceptions', 'FumLost', 'FumOppRec',
+         'OffenseYds', 'OffensePlays')
+
+
+def legacy_game_stats(game, team):
+    """
+    Build the nested dict per game the way NFLTeam.parse_game_stats used to
+    """
+    game_stats = {'offense': {}, 'defense': {}}
+    home_team = game['homeTeam']['Abbreviation']
+    away_team = game['awayTeam']['Abbreviation']
+    game_stats['week'] = game['week']
+    game_stats['date'] = game['date']
+    game_stats['time'] = game['time']
+    if home_team == team:
+        game_stats['gameType'] = 'homeGame'
+        game_stats['opponent'] = away_team
+        game_stats['pointsFor'] = int(game['homeTeam']['stats']['PointsFor']['#text'])
+        game_stats['pointsAgainst'] = int(game['homeTeam']['stats']['PointsAgainst']['#text'])
+        game_stats['interceptionsThrown'] = int(game['homeTeam']['stats']['PassInt']['#text'])
+        game_stats['interceptions'] = int(game['homeTeam']['stats']['Interceptions']['#text'])
+        game_stats['fumblesLost'] = int(game['homeTeam']['stats']['FumLost']['#text'])
+        game_stats['fumblesRecovered'] = int(game['homeTeam']['stats']['FumOppRec']['#text'])
+        game_stats['offense']['yardsGained'] = int(game['homeTeam']['stats']['OffenseYds']['#text'])
+        game_stats['defense']['yardsAllowed'] = int(game['awayTeam']['stats']['OffenseYds']['#text'])
+        game_stats['defense']['plays'] = int(game['awayTeam']['stats']['OffensePlays']['#text'])
+        game_stats['offense']['1stQuarterPoints'] = int(game['quarter_summary']['quarter'][0]['homeScore'])
+        game_stats['defense']['1stQuarterPoints'] = int(game['quarter_summary']['quarter'][0]['awayScore'])
+        game_stats['offense']['2ndQuarterPoints'] = int(game['quarter_summary']['quarter'][1]['homeScore'])
+        game_stats['defense']['2ndQuarterPoints'] = int(game['quarter_summary']['quarter'][1]['awayScore'])
+        game_stats['offense']['3rdQuarterPoints'] = int(game['quarter_summary']['quarter'][2]['homeScore'])
+        game_stats['defense']['3rdQuarterPoints'] = int(game['quarter_summary']['quarter'][2]['awayScore'])
+        game_stats['offense']['4thQuarterPoints'] = int(game['quarter_summary']['quarter'][3]['homeScore'])
+        game_stats['defense']['4thQuarterPoints'] = int(game['quarter_summary']['quarter'][3]['awayScore'])
+    else:
+        game_stats['gameType'] = 'roadGame'
+        game_stats['opponent'] = home_team
+        game_stats['pointsFor'] = int(game['awayTeam']['stats']['PointsFor']['#text'])
+        game_stats['pointsAgainst'] = int(game['awayTeam']['stats']['PointsAgainst']['#text'])
+        game_stats['interceptionsThrown'] = int(game['awayTeam']['stats']['PassInt']['#text'])
+        game_stats['interceptions'] = int(game['awayTeam']['stats']['Interceptions']['#text'])
+        game_stats['fumblesLost'] = int(game['awayTeam']['stats']['FumLost']['#text'])
+        game_stats['fumblesRecovered'] = int(game['awayTeam']['stats']['FumOppRec']['#text'])
+        game_stats['offense']['yardsGained'] = game['awayTeam']['stats']['OffenseYds']['#text']
+        game_stats['defense']['yardsAllowed'] = game['homeTeam']['stats']['OffenseYds']['#text']
+        game_stats['defense']['plays'] = int(game['homeTeam']['stats']['OffensePlays']['#text'])
+        game_stats['defense']['1stQuarterPoints'] = int(game['quarter_summary']['quarter'][0]['homeScore'])
+        game_stats['offense']['1stQuarterPoints'] = int(game['quarter_summary']['quarter'][0]['awayScore'])
+        game_stats['defense']['2ndQuarterPoints'] = int(game['quarter_summary']['quarter'][1]['homeScore'])
+        game_stats['offense']['2ndQuarterPoints'] = int(game['quarter_summary']['quarter'][1]['awayScore'])
+        game_stats['defense']['3rdQuarterPoints'] = int(game['quarter_summary']['quarter'][2]['homeScore'])
+        game_stats['offense']['3rdQuarterPoints'] = int(game['quarter_summary']['quarter'][2]['awayScore'])
+        game_stats['defense']['4thQuarterPoints'] = int(game['quarter_summary']['quarter'][3]['homeScore'])
+        game_stats['offense']['4thQuarterPoints'] = int(game['quarter_summary']['quarter'][3]['awayScore'])
+    return game_stats
+
+
+def boxscore_games(seasons, rng):
+    """
+    Build games with boxscore results for every week of several seasons
+    """
+    games = []
+    for season in range(seasons):
+        for week in range(1, 17):
+            teams = TEAMS[:]
+            rng.shuffle(teams)
+            for home, away in zip(teams[::2], teams[1::2]):
+                game = {
+                    'week': str(week),
+                    'date': f"{2015 + season}-10-{week:02d}",
+                    'time': '1:00PM',
+                    'homeTeam': {'Abbreviation': home},
+                    'awayTeam': {'Abbreviation': away},
+                    'quarter_summary': {'quarter': [
+                        {'homeScore': str(rng.randint(0, 14)), 'awayScore': str(rng.randint(0, 14))}
+                        for i in range(4)
+                    ]}
+                }
+                for side in ('homeTeam', 'awayTeam'):
+                    game[side]['stats'] = {i: {'#text': str(rng.randint(0, 450))} for i in STATS}
+                games.append(game)
+    return games
+
+
+def resident_size(build, games):
+    tracemalloc.start()
+    records = build(games)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    return size
+
+
+def main(seasons=5, number=3):
+    games = boxscore_games(seasons, random.Random(1))
+    records = len(games) * 2
+    builders = (
+        ('dict', lambda games: [legacy_game_stats(game, team) for game in games
+                                for team in (game['homeTeam']['Abbreviation'], game['awayTeam']['Abbreviation'])]),
+        ('record', lambda games: [GameStats.from_game(game, team) for game in games
+                                  for team in (game['homeTeam']['Abbreviation'], game['awayTeam']['Abbreviation'])])
+    )
+    print(f"{seasons} seasons, {records} team games")
+    for name, build in builders:
+        seconds = timeit.timeit(lambda: build(games), number=number)
+        per_game = seconds / (number * records) * 1e6
+        size = resident_size(build, games)
+        print(f"{name:>6}: {per_game:.1f} us per game, {size / records:.0f} bytes per game resident")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+"""
+Micro-benchmark of SlackArgParse against the legacy regex per arg parser
+
+Run from the repo root: python tests/bench_slackparse.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from test_jockbot import PARITY_TEXTS, compiled_parse_args, get_config, legacy_parse_args  # noqa
+
+
+def main(number=2000):
+    valid_args = get_config()['valid_args']
+    for name, func in (('legacy', legacy_parse_args), ('compiled', compiled_parse_args)):
+        seconds = timeit.timeit(
+            lambda: [func(valid_args, text) for text in PARITY_TEXTS],
+            number=number
+        )
+        per_parse = seconds / (number * len(PARITY_TEXTS)) * 1e6
+        print(f"{name:>8}: {per_parse:.1f} us per message")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,39 @@
+import aiohttp
+import asyncio
+import concurrent.futures
+import datetime
 import json
 import os
+import random
+import re
 import sys
+import tempfile
+import threading
+import time
+import types
 import unittest
 import nose
 
+from libs.nfl import NFL, NFLTeam
+from libs.nfl_schedule import ScheduleIndex
+from libs.nfl_stats import GameStats, SeasonColumns
+from libs.nfl_store import BoxscoreStore
+from libs.slack_dispatch import RateLimiter, SlackDispatcher
+from libs.slack_filter import EventFilter
+from libs.slack_mlb import SlackMLB
+from utils.cache import TTLCache
+from utils.command import BaseCommand
+from utils.data_context import DataContext, construction_stats
+from utils.exceptions import BotCommandError, NFLRequestException
+from utils.helpers import ConfigStore
+from utils.registry import CommandRegistry
+from utils.reply_cache import REPLY_TTLS, ReplyCache, reply_key
+from utils.scheduler import CommandScheduler
+from utils.singleflight import SingleFlight
 from utils.slackparse import SlackArgParse
+from utils.snapshots import SnapshotStore
+from utils.stats_cache import StatsCache
+from utils.subqueries import run_parts
 
 
 def get_config():
@@ -23,6 +52,83 @@ def get_config():
     return config
 
 
+class FakeSlackClient:
+    """Record Slack API calls, answering each with respond"""
+
+    def __init__(self, respond=None):
+        self.respond = respond or (lambda method, kwargs: {'ok': True})
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def api_call(self, method, **kwargs):
+        with self.lock:
+            self.calls.append((time.monotonic(), method, kwargs))
+        return self.respond(method, kwargs)
+
+    def wait_for(self, count, timeout=2):
+        deadline = time.monotonic() + timeout
+        while len(self.calls) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.calls
+
+
+def legacy_parse_args(cmd_args, text):
+    """Reference copy of the regex per arg parser SlackArgParse replaced"""
+    args = {}
+    search_args = {
+        i: re.compile(f'(?<=-{i} ).*?(?= -\\D|\\Z)') for i in cmd_args.keys()
+    }
+    search_short_args = {
+        i: re.compile(f'(?<=-{cmd_args[i]["short"]} ).*?(?= -\\D|\\Z)') for i in cmd_args.keys()
+    }
+    for k, v in search_args.items():
+        if v.search(text):
+            arg = v.search(text).group()
+            args[k] = SlackArgParse.format_args(cmd_args[k]["type"], arg)
+        elif search_short_args[k].search(text):
+            arg = search_short_args[k].search(text).group()
+            args[k] = SlackArgParse.format_args(cmd_args[k]["type"], arg)
+        else:
+            args[k] = False
+    for k, v in cmd_args.items():
+        if cmd_args[k]["type"] == "flag":
+            if re.search(r'.*--{}.*'.format(k), text):
+                args[k] = True
+    return args
+
+
+def compiled_parse_args(cmd_args, text):
+    """Parse only the args of text with SlackArgParse"""
+    parser = SlackArgParse(cmd_args, [], '')
+    parser.args = parser.parse_args(cmd_args, text)
+    parser.parse_flags(cmd_args, text)
+    return parser.args
+
+
+PARITY_TEXTS = [
+    'scores mlb',
+    'scores -t boston -l nhl',
+    'scores -team boston -league nhl',
+    'standings nhl --division',
+    'standings nhl -d',
+    'standings nhl -d -l nhl',
+    'standings -conf -l nhl --conference',
+    'scores -t new york -t boston',
+    'scores -g -5 -t boston',
+    'scores -t st. louis -g 3',
+    'scores -m bruins habs -l nhl',
+    'scores -t  -l nhl',
+    'scores -t boston\n-l nhl',
+    'scores -l nhl\n-t boston -g 2',
+    'scores -t bos-ton -l nhl',
+    'scores x-t boston',
+    'scores --team boston',
+    'stats -p brad marchand -s 20182019 -c goals',
+    'scores -l ',
+    '',
+]
+
+
 class JockBotTest(unittest.TestCase):
 
     def setUp(self):
@@ -48,6 +154,664 @@ class JockBotTest(unittest.TestCase):
         self.assertEqual(team, 'boston', "Incorrect Team")
         self.assertEqual(league, 'nhl', "Incorrect League")
 
+    def test_parser_parity(self):
+        """Test the compiled tokenizer matches the legacy regex parser"""
+        for text in PARITY_TEXTS:
+            args = compiled_parse_args(self.valid_args, text)
+            self.assertEqual(args, legacy_parse_args(self.valid_args, text), repr(text))
+
+    def test_parser_parity_fuzz(self):
+        """Test the compiled tokenizer against the legacy parser on random text"""
+        rng = random.Random(1)
+        markers = []
+        for name, spec in self.valid_args.items():
+            markers += [f'-{name}', f'-{spec["short"]}', f'--{name}']
+        words = markers + ['boston', 'nhl', 'new', 'york', '-5', '-', '-x', ' ', '\n', 'a-t', '']
+        for i in range(2000):
+            text = ' '.join(rng.choice(words) for j in range(rng.randint(0, 10)))
+            args = compiled_parse_args(self.valid_args, text)
+            self.assertEqual(args, legacy_parse_args(self.valid_args, text), repr(text))
+
+
+class CommandSchedulerTest(unittest.TestCase):
+
+    def test_round_robin_and_backpressure(self):
+        """Test channels are served in turn and full channels are rejected"""
+        gate = threading.Event()
+        order = []
+        scheduler = CommandScheduler(workers=1, max_queued=5, max_per_channel=2)
+        scheduler.submit('blocker', gate.wait)
+        time.sleep(0.05)
+        self.assertTrue(scheduler.submit('a', order.append, 'a'))
+        self.assertTrue(scheduler.submit('a', order.append, 'a'))
+        self.assertFalse(scheduler.submit('a', order.append, 'a'))
+        self.assertTrue(scheduler.submit('b', order.append, 'b'))
+        gate.set()
+        time.sleep(0.1)
+        self.assertEqual(order, ['a', 'b', 'a'])
+        self.assertEqual(scheduler.stats['rejected'], 1)
+
+
+class SlackDispatcherTest(unittest.TestCase):
+
+    def test_token_bucket(self):
+        """Test a method gets a burst of a tenth of its limit then its rate"""
+        limiter = RateLimiter({'reactions.add': 60})
+        self.assertEqual([limiter.delay(('reactions.add',), 0) for i in range(6)], [0] * 6)
+        self.assertAlmostEqual(limiter.delay(('reactions.add',), 0), 1)
+        self.assertEqual(limiter.delay(('reactions.add',), 1), 0)
+        self.assertEqual(limiter.delay(('chat.unfurl',), 0), 0)
+
+    def test_ratelimited_blocks_method_and_keeps_order(self):
+        """Test Retry-After holds the method on every channel and a channel's calls stay in order"""
+        responses = [{'ok': False, 'error': 'ratelimited', 'headers': {'Retry-After': '0.2'}}]
+        client = FakeSlackClient(lambda method, kwargs: responses.pop() if responses else {'ok': True})
+        dispatcher = SlackDispatcher(client, workers=2)
+        start = time.monotonic()
+        for text in ('1', '2', '3'):
+            dispatcher.call('chat.postMessage', 'C1', text=text)
+        dispatcher.call('chat.postMessage', 'C2', text='other')
+        calls = client.wait_for(5)
+        first = [i for i in calls if i[2]['text'] == '1']
+        self.assertEqual(len(first), 2)
+        self.assertGreaterEqual(first[1][0] - start, 0.2)
+        c1 = [i[2]['text'] for i in calls if i[2]['channel'] == 'C1']
+        self.assertEqual(c1, ['1', '1', '2', '3'])
+        other = [i for i in calls if i[2]['channel'] == 'C2']
+        self.assertGreaterEqual(other[0][0] - start, 0.2)
+        self.assertEqual(dispatcher.stats['ratelimited'], 1)
+
+    def test_transport_error_retries_only_that_call(self):
+        """Test a failed call is retried alone without blocking its method"""
+        failures = [ConnectionError('reset')]
+
+        def respond(method, kwargs):
+            if kwargs['channel'] == 'C1' and failures:
+                raise failures.pop()
+            return {'ok': True}
+        client = FakeSlackClient(respond)
+        dispatcher = SlackDispatcher(client, workers=2, error_delay=0.2)
+        start = time.monotonic()
+        dispatcher.call('chat.postMessage', 'C1', text='retried')
+        time.sleep(0.05)
+        dispatcher.call('chat.postMessage', 'C2', text='other')
+        calls = client.wait_for(3)
+        sent = [(i[2]['text'], i[0] - start) for i in calls]
+        self.assertEqual([i[0] for i in sent], ['retried', 'other', 'retried'])
+        self.assertLess(sent[1][1], 0.2)
+        self.assertGreaterEqual(sent[2][1], 0.2)
+        self.assertEqual(dispatcher.stats['errors'], 1)
+        self.assertEqual(dispatcher.stats['sent'], 2)
+
+    def test_deferred_call_cancelled_before_and_after_delay(self):
+        """Test cancelled deferred calls are never sent and released ones are"""
+        client = FakeSlackClient()
+        dispatcher = SlackDispatcher(client, workers=1)
+        dispatcher.defer(('spinning', '1'), 0.1, 'reactions.add', 'C1', name='spinning', timestamp='1')
+        self.assertTrue(dispatcher.cancel(('spinning', '1')))
+        dispatcher.defer(('spinning', '2'), 0.05, 'reactions.add', 'C1', name='spinning', timestamp='2')
+        calls = client.wait_for(1)
+        self.assertFalse(dispatcher.cancel(('spinning', '2')))
+        time.sleep(0.15)
+        self.assertEqual([i[2]['timestamp'] for i in calls], ['2'])
+        self.assertEqual(dispatcher.stats['elided'], 1)
+        self.assertEqual(dispatcher.stats['deferred'], 0)
+
+
+class TTLCacheTest(unittest.TestCase):
+
+    def test_expiry_and_lru_eviction(self):
+        """Test entries expire and the least recently used entry is evicted"""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('d', 4, ttl=0)
+        self.assertIsNone(cache.get('d'))
+        self.assertEqual(cache.stats['hits'], 2)
+        self.assertEqual(cache.stats['misses'], 2)
+
+
+class BaseCommandTest(unittest.TestCase):
+
+    def test_run_cmd_runs_once(self):
+        """Test run_cmd builds its reply once and can't run from __init__"""
+        class Counted(BaseCommand):
+            def __init__(self, event, user):
+                self.runs = 0
+
+            def run_cmd(self):
+                self.runs += 1
+                return f'reply {self.runs}'
+
+        class Eager(BaseCommand):
+            def __init__(self, event, user):
+                self.response = self.run_cmd()
+
+            def run_cmd(self):
+                return 'reply'
+
+        command = Counted({}, {})
+        self.assertEqual(command.run_cmd(), 'reply 1')
+        self.assertEqual(command.run_cmd(), 'reply 1')
+        self.assertEqual(command.runs, 1)
+        with self.assertRaises(BotCommandError):
+            Eager({}, {})
+        with self.assertRaises(TypeError):
+            type('Unfinished', (BaseCommand,), {})()
+
+
+class CommandRegistryTest(unittest.TestCase):
+
+    def test_aliases_unknown_and_invalid_commands(self):
+        """Test aliases resolve, unknown names give None and modules without a runnable BaseCommand raise"""
+        path = tempfile.mkdtemp()
+        package = os.path.join(path, 'registry_commands')
+        os.mkdir(package)
+        modules = {
+            '__init__.py': '',
+            'hello.py': (
+                'from utils.command import BaseCommand\n\n\nclass BotCommand(BaseCommand):\n'
+                '    def run_cmd(self):\n        return "hello"\n'
+            ),
+            'broken.py': 'class BotCommand:\n    pass\n',
+            'unfinished.py': 'from utils.command import BaseCommand\n\n\nclass BotCommand(BaseCommand):\n    pass\n',
+            '_private.py': ''
+        }
+        for name, source in modules.items():
+            with open(os.path.join(package, name), 'w') as f:
+                f.write(source)
+        sys.path.insert(0, path)
+        try:
+            registry = CommandRegistry(package, package='registry_commands', aliases={'hi': 'hello'})
+            self.assertEqual(registry.names, ['broken', 'hello', 'unfinished'])
+            self.assertIn('hi', registry)
+            self.assertIs(registry.get('hi'), registry.get('hello'))
+            self.assertEqual(registry.get('hello').__module__, 'registry_commands.hello')
+            self.assertIsNone(registry.get('goodbye'))
+            self.assertIsNone(registry.get('_private'))
+            with self.assertRaises(BotCommandError):
+                registry.get('broken')
+            with self.assertRaises(BotCommandError):
+                registry.get('unfinished')
+            thread = registry.preload(['hello'])
+            self.assertIs(registry.preload(['hello']), thread)
+        finally:
+            sys.path.remove(path)
+
+
+class ConfigStoreTest(unittest.TestCase):
+
+    def test_reload_on_mtime_and_read_only(self):
+        """Test configs are reparsed only when their mtime changes and can't be modified"""
+        path = tempfile.mkdtemp()
+        config_file = os.path.join(path, 'test.json')
+        with open(config_file, 'w') as f:
+            json.dump({'names': ['jockbot'], 'scheduler': {'workers': 4}}, f)
+        store = ConfigStore(path)
+        config = store.get('test.json')
+        self.assertIs(store.get('test.json'), config)
+        self.assertIsInstance(config, types.MappingProxyType)
+        self.assertIsInstance(config['scheduler'], types.MappingProxyType)
+        self.assertEqual(config['names'], ('jockbot',))
+        with self.assertRaises(TypeError):
+            config['scheduler']['workers'] = 8
+        with open(config_file, 'w') as f:
+            json.dump({'names': ['jockbot', 'jb'], 'scheduler': {'workers': 8}}, f)
+        mtime = os.stat(config_file).st_mtime_ns + 10 ** 9
+        os.utime(config_file, ns=(mtime, mtime))
+        reloaded = store.get('test.json')
+        self.assertIsNot(reloaded, config)
+        self.assertEqual(reloaded['scheduler']['workers'], 8)
+        self.assertEqual(reloaded['names'], ('jockbot', 'jb'))
+
+
+class EventFilterTest(unittest.TestCase):
+
+    def test_only_commands_pass(self):
+        """Test each kind of non-command event is dropped and counted"""
+        event_filter = EventFilter(['jockbot', 'jb'])
+        message = {'type': 'message', 'user': 'U1', 'channel': 'C1', 'ts': '1.0'}
+        events = [
+            dict(message, bot_id='B1', text='jockbot scores'),
+            dict(message, subtype='channel_join', text='joined'),
+            dict(message, subtype='message_changed', message={'text': 'jockbot scores'}),
+            dict(message, text='scores are in'),
+            {'type': 'user_typing', 'user': 'U1', 'channel': 'C1'},
+            dict(message, text='JB scores -l nhl')
+        ]
+        accepted = [i for i in events if event_filter.accept(i)]
+        self.assertEqual(accepted, [events[-1]])
+        self.assertEqual(event_filter.stats, {
+            'dropped_bot': 1,
+            'dropped_subtype': 2,
+            'dropped_not_command': 1,
+            'dropped_type': 1,
+            'accepted': 1
+        })
+
+
+class StatsCacheTest(unittest.TestCase):
+
+    def test_namespace_ttl_and_eviction(self):
+        """Test entries persist, expire by namespace and are evicted by size"""
+        path = tempfile.mkdtemp()
+        ttls = {'standings': 0, 'scrape': 60, 'boxscores': None}
+        cache = StatsCache(path, ttls=ttls, max_bytes=120)
+        cache.set('standings', 'division', {'rank': 1})
+        cache.set('boxscores', '2018/1', {'score': 'a' * 40})
+        cache.set('scrape', 'ne/2018', {'stats': 'a' * 40})
+        reopened = StatsCache(path, ttls=ttls, max_bytes=120)
+        self.assertIsNone(reopened.get('standings', 'division'))
+        self.assertEqual(reopened.stale('standings', 'division')[0], {'rank': 1})
+        self.assertIsNone(reopened.stale('standings', 'conference'))
+        self.assertEqual(reopened.get('boxscores', '2018/1'), {'score': 'a' * 40})
+        time.sleep(0.01)
+        for i in range(2, 5):
+            cache.set('boxscores', f'2018/{i}', {'score': 'b' * 40})
+        cache.set('scrape', 'ne/2017', {'stats': 'b' * 40})
+        cache.set('scrape', 'ne/2016', {'stats': 'c' * 40})
+        self.assertFalse(os.path.exists(os.path.join(path, 'scrape', 'ne', '2018.json')))
+        self.assertIsNone(cache.get('scrape', 'ne/2018'))
+        self.assertEqual(cache.get('scrape', 'ne/2016'), {'stats': 'c' * 40})
+        self.assertEqual(reopened.get('boxscores', '2018/1'), {'score': 'a' * 40})
+        self.assertEqual(cache.stats['scrape']['evictions'], 1)
+        self.assertNotIn('evictions', cache.stats['boxscores'])
+        self.assertEqual(reopened.stats['standings']['expired'], 1)
+
+    def test_expired_stats_served_on_request_failure(self):
+        """Test the NFL client falls back to expired stats when Mysportsfeeds fails"""
+        client = NFL()
+        client.cache = StatsCache(tempfile.mkdtemp(), ttls={'nfl_standings': 0})
+        client.cache.set('nfl_standings', 'division_team_standings_2018-regular', {'division': []})
+
+        def request(*args):
+            raise NFLRequestException('down')
+        client.request_team_stats = client.request_schedule = request
+        self.assertEqual(client.fetch_team_stats(), {'division': []})
+        self.assertIsNotNone(client.stale_age)
+        with self.assertRaises(NFLRequestException):
+            client.get_schedule('NE')
+
+
+def legacy_season_totals(team_game_stats):
+    """Season totals summed per game the way NFLTeam's removed loops did"""
+    totals = {'home': [0, 0, 0], 'road': [0, 0, 0], 'turnovers': 0, 'takeaways': 0,
+              'plays_allowed': 0, 'yards_allowed': 0, 'quarters_for': [], 'quarters_against': []}
+    for game in team_game_stats:
+        record = totals['home' if game.home else 'road']
+        if game.points_for > game.points_against:
+            record[0] += 1
+        elif game.points_for < game.points_against:
+            record[1] += 1
+        else:
+            record[2] += 1
+        totals['turnovers'] += game.interceptions_thrown + game.fumbles_lost
+        totals['takeaways'] += game.fumbles_recovered + game.interceptions
+        totals['plays_allowed'] += game.plays_allowed
+        totals['yards_allowed'] += int(game.yards_allowed)
+        totals['quarters_for'].append(game.quarters_for)
+        totals['quarters_against'].append(game.quarters_against)
+    totals['quarters_for'] = [sum(i) for i in zip(*totals['quarters_for'])]
+    totals['quarters_against'] = [sum(i) for i in zip(*totals['quarters_against'])]
+    return totals
+
+
+class SeasonColumnsTest(unittest.TestCase):
+
+    games = {
+        'NE': [
+            GameStats('1', '2018-09-09', '1:00PM', True, 'HOU', 27, 20, 1, 2, 0, 1, 401, 348, 62,
+                      (7, 14, 3, 3), (0, 7, 6, 7)),
+            GameStats('2', '2018-09-16', '8:20PM', False, 'JAX', 20, 31, 2, 0, 1, 0, 327, 480, 70,
+                      (0, 3, 10, 7), (14, 7, 3, 7)),
+            GameStats('3', '2018-09-23', '8:20PM', False, 'DET', 10, 10, 0, 1, 0, 0, 209, 301, 66,
+                      (3, 0, 7, 0), (0, 7, 0, 3)),
+            GameStats('4', '2018-09-30', '1:00PM', True, 'MIA', 38, 7, 0, 0, 0, 2, 449, 172, 48,
+                      (7, 17, 7, 7), (0, 0, 7, 0))
+        ],
+        'NYJ': [
+            GameStats('1', '2018-09-10', '7:10PM', False, 'DET', 48, 17, 1, 5, 0, 0, 349, 413, 70,
+                      (10, 24, 14, 0), (7, 3, 0, 7)),
+            GameStats('2', '2018-09-16', '1:00PM', True, 'MIA', 12, 20, 1, 1, 1, 0, 315, 257, 57,
+                      (0, 0, 6, 6), (14, 6, 0, 0))
+        ]
+    }
+
+    def check_totals(self, totals, legacy):
+        self.assertEqual([totals['home_wins'], totals['home_losses'], totals['home_ties']], legacy['home'])
+        self.assertEqual([totals['road_wins'], totals['road_losses'], totals['road_ties']], legacy['road'])
+        for key in ('turnovers', 'takeaways', 'plays_allowed', 'yards_allowed'):
+            self.assertEqual(totals[key], legacy[key], key)
+        self.assertEqual(totals['quarters_for'].tolist(), legacy['quarters_for'])
+        self.assertEqual(totals['quarters_against'].tolist(), legacy['quarters_against'])
+
+    def test_aggregate_matches_per_game_sums(self):
+        """Test one team's vectorized totals equal the per game loops"""
+        games = self.games['NE']
+        totals = {k: v[0] for k, v in SeasonColumns.from_game_stats(games).aggregate(teams=1).items()}
+        self.check_totals(totals, legacy_season_totals(games))
+
+    def test_concatenated_teams_aggregate_separately(self):
+        """Test stacked teams get the same totals as each team alone"""
+        columns = SeasonColumns.concatenate(SeasonColumns.from_game_stats(self.games[i]) for i in ('NE', 'NYJ'))
+        totals = columns.aggregate()
+        for i, team in enumerate(('NE', 'NYJ')):
+            self.check_totals({k: v[i] for k, v in totals.items()}, legacy_season_totals(self.games[team]))
+
+    def test_parse_season_stats_values_and_types(self):
+        """Test NFLTeam season attributes keep the loops' values and int types"""
+        team = NFLTeam.__new__(NFLTeam)
+        team.season_columns = SeasonColumns.from_game_stats(self.games['NE'])
+        team.parse_season_stats()
+        legacy = legacy_season_totals(self.games['NE'])
+        self.assertEqual(team.home_record, '2-0-0')
+        self.assertEqual(team.road_record, '0-1-1')
+        values = {
+            'turnovers': team.turnovers,
+            'takeaways': team.takeaways,
+            'defense_plays': team.defense_plays,
+            'total_yards_allowed': team.total_yards_allowed,
+            'first_quarter_points_scored': team.first_quarter_points_scored,
+            'fourth_quarter_points_allowed': team.fourth_quarter_points_allowed
+        }
+        self.assertEqual(values, {
+            'turnovers': legacy['turnovers'],
+            'takeaways': legacy['takeaways'],
+            'defense_plays': legacy['plays_allowed'],
+            'total_yards_allowed': legacy['yards_allowed'],
+            'first_quarter_points_scored': legacy['quarters_for'][0],
+            'fourth_quarter_points_allowed': legacy['quarters_against'][3]
+        })
+        self.assertTrue(all(type(i) is int for i in values.values()))
+        self.assertEqual(team.turnover_diff, legacy['takeaways'] - legacy['turnovers'])
+
+
+class GameResultsTest(unittest.TestCase):
+
+    def test_results_leave_cached_schedule_untouched(self):
+        """Test adding results to a game copies it and its team dicts"""
+        game = {'id': '1', 'homeTeam': {'Abbreviation': 'NE'}, 'awayTeam': {'Abbreviation': 'HOU'}}
+        cached = json.loads(json.dumps(game))
+        result = NFLTeam.with_results(game, {'quarter': []}, {'homeScore': '27'}, {'PassInt': 1}, {'PassInt': 0})
+        self.assertEqual(game, cached)
+        self.assertEqual(result['homeTeam'], {'Abbreviation': 'NE', 'stats': {'PassInt': 0}})
+        self.assertEqual(result['awayTeam']['stats'], {'PassInt': 1})
+        self.assertEqual(result['game_score'], {'homeScore': '27'})
+
+
+
+    def test_boxscore_and_bulk_paths_agree(self):
+        """Test canned boxscore and bulk payloads parse to the same game stats"""
+        games = [
+            {'id': '1', 'week': '1', 'date': '2018-09-09', 'time': '1:00PM',
+             'homeTeam': {'Abbreviation': 'NE'}, 'awayTeam': {'Abbreviation': 'HOU'}},
+            {'id': '2', 'week': '2', 'date': '2018-09-16', 'time': '8:20PM',
+             'homeTeam': {'Abbreviation': 'JAX'}, 'awayTeam': {'Abbreviation': 'NE'}}
+        ]
+        quarters = {'1': [(7, 3), (14, 3), (0, 7), (6, 7)], '2': [(0, 14), (7, 10), (3, 7), (10, 0)]}
+        yards = {('1', 'NE'): 390, ('1', 'HOU'): 340, ('2', 'NE'): 402, ('2', 'JAX'): 375}
+
+        def stats(game_id, team, points_for, points_against):
+            values = {
+                'PointsFor': points_for, 'PointsAgainst': points_against, 'PassInt': 1, 'Interceptions': 2,
+                'FumLost': 0, 'FumOppRec': 1, 'OffenseYds': yards[(game_id, team)], 'OffensePlays': 64
+            }
+            return {k: {'#text': str(v)} for k, v in values.items()}
+
+        boxscores = {}
+        game_logs = []
+        season_games = []
+        for game in games:
+            home = sum(i[0] for i in quarters[game['id']])
+            away = sum(i[1] for i in quarters[game['id']])
+            home_stats = stats(game['id'], game['homeTeam']['Abbreviation'], home, away)
+            away_stats = stats(game['id'], game['awayTeam']['Abbreviation'], away, home)
+            summary = {
+                'quarter': [
+                    {'@number': str(n), 'awayScore': str(a), 'homeScore': str(h)}
+                    for n, (h, a) in enumerate(quarters[game['id']], 1)
+                ],
+                'quarterTotals': {'awayScore': str(away), 'homeScore': str(home)}
+            }
+            boxscores[game['id']] = {'gameboxscore': {
+                'quarterSummary': summary,
+                'awayTeam': {'awayTeamStats': away_stats},
+                'homeTeam': {'homeTeamStats': home_stats}
+            }}
+            for side, team_stats in (('homeTeam', home_stats), ('awayTeam', away_stats)):
+                game_logs.append({
+                    'game': {'id': int(game['id'])}, 'team': {'Abbreviation': game[side]['Abbreviation']},
+                    'stats': team_stats
+                })
+            season_games.append({'schedule': {'id': int(game['id'])}, 'score': {
+                'quarters': [
+                    {'quarterNumber': n, 'awayScore': a, 'homeScore': h}
+                    for n, (h, a) in enumerate(quarters[game['id']], 1)
+                ],
+                'awayScoreTotal': away, 'homeScoreTotal': home
+            }})
+
+        async def fetch_boxscore(season, game):
+            return boxscores[game['id']]
+
+        async def fetch_game_logs(teams):
+            self.assertEqual(teams, 'HOU,JAX,NE')
+            return {'teamgamelogs': {'gamelogs': game_logs}}
+
+        async def fetch_season_games(team):
+            return {'games': season_games}
+
+        parsed = {}
+        for data_path in ('boxscore', 'bulk'):
+            team = NFLTeam('patriots', data_path=data_path)
+            team.config = {'abbreviations': {'patriots': 'ne'}}
+            team.played_games = games
+            team.fetch_boxscore = fetch_boxscore
+            team.fetch_game_logs = fetch_game_logs
+            team.fetch_season_games = fetch_season_games
+            try:
+                parsed[data_path] = sorted(team.team_game_stats)
+            finally:
+                team.close()
+        self.assertEqual(len(parsed['bulk']), 2)
+        self.assertEqual(parsed['boxscore'], parsed['bulk'])
+        self.assertEqual(parsed['bulk'][1].quarters_for, (14, 10, 7, 0))
+
+class MySportsFeedsTest(unittest.TestCase):
+
+    def test_loop_and_session_reused_until_close(self):
+        """Test runs share one event loop and aiohttp session until closed"""
+        client = NFL()
+
+        async def open_session():
+            if client.http is None:
+                client.http = aiohttp.ClientSession()
+            return asyncio.get_event_loop(), client.http
+        first = client.run(open_session())
+        self.assertEqual(client.run(open_session()), first)
+        client.close()
+        loop, session = first
+        self.assertTrue(loop.is_closed())
+        self.assertTrue(session.closed)
+        self.assertIsNone(client.loop)
+        client.close()
+
+class BoxscoreStoreTest(unittest.TestCase):
+
+    def test_only_completed_games_are_final(self):
+        """Test a boxscore is only final once past its date and completed"""
+        quarters = [{'@number': str(i), 'awayScore': '7', 'homeScore': '3'} for i in range(1, 5)]
+        summary = {'quarter': quarters, 'quarterTotals': {'awayScore': '28', 'homeScore': '12'}}
+        played = {'gameboxscore': {'quarterSummary': summary}}
+        in_progress = {'gameboxscore': {'quarterSummary': {'quarter': quarters[:2], 'quarterTotals': {}}}}
+        postponed = {'gameboxscore': {'quarterSummary': None}}
+        flagged = {'gameboxscore': {'game': {'isCompleted': 'false'}, 'quarterSummary': summary}}
+        self.assertTrue(BoxscoreStore.is_complete(played))
+        self.assertFalse(BoxscoreStore.is_complete(in_progress))
+        self.assertFalse(BoxscoreStore.is_complete(postponed))
+        self.assertFalse(BoxscoreStore.is_complete(flagged))
+        game = {'date': '2018-09-09'}
+        self.assertFalse(BoxscoreStore.is_final(game, datetime.datetime(2018, 9, 10)))
+        self.assertTrue(BoxscoreStore.is_final(game, datetime.datetime(2018, 9, 11)))
+
+
+class SnapshotStoreTest(unittest.TestCase):
+
+    def test_stale_while_revalidate(self):
+        """Test stale data is served while refreshing and refresh errors are hidden"""
+        store = SnapshotStore(max_age=0.05)
+        values = iter([1, RuntimeError('down'), 2])
+
+        def loader():
+            value = next(values)
+            if isinstance(value, Exception):
+                raise value
+            return value
+        self.assertEqual(store.get('scores', loader).value, 1)
+        time.sleep(0.06)
+        snapshot = store.get('scores', loader)
+        self.assertEqual((snapshot.value, snapshot.stale), (1, True))
+        time.sleep(0.02)
+        self.assertEqual(store.get('scores', loader).value, 1)
+        time.sleep(0.02)
+        self.assertEqual(store.get('scores', loader).value, 2)
+        self.assertEqual(store.stats['refresh_errors'], 1)
+        with self.assertRaises(ZeroDivisionError):
+            store.get('standings', lambda: 1 / 0)
+
+
+class ReplyCacheTest(unittest.TestCase):
+
+    def test_snapshot_invalidation(self):
+        """Test replies are keyed on normalized args and dropped when a snapshot refreshes"""
+        snapshots = SnapshotStore()
+        replies = ReplyCache(snapshots)
+        snapshot = snapshots.get('nhl', lambda: 'games')
+        replies.set(reply_key('nhl', 'scores', {'team': 'boston '}), 'reply', {'nhl': snapshot.version}, ttl=60)
+        self.assertEqual(replies.get(reply_key('nhl', 'scores', {'team': 'boston'})), 'reply')
+        self.assertIsNone(replies.get(reply_key('nhl', 'standings', {'team': 'boston'})))
+        snapshots._load('nhl', lambda: 'new games')
+        self.assertIsNone(replies.get(reply_key('nhl', 'scores', {'team': 'boston'})))
+        self.assertEqual(replies.stats, {'hits': 1, 'misses': 1, 'invalidated': 1, 'size': 0})
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def test_concurrent_calls_share_one_result(self):
+        """Test concurrent calls for one key run once and share the result"""
+        flights = SingleFlight()
+        gate = threading.Event()
+        calls = []
+        results = []
+
+        def standings():
+            calls.append(1)
+            gate.wait()
+            return 'standings'
+        threads = [threading.Thread(target=lambda: results.append(flights.do('mlb', standings))) for i in range(5)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        gate.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['standings'] * 5)
+        self.assertEqual(flights.stats['mlb'], {'executed': 1, 'shared': 4})
+
+
+class ReplyTTLTest(unittest.TestCase):
+
+    def test_live_team_game_uses_live_ttl(self):
+        """Test an MLB team reply is cached briefly while the team's game is live"""
+        class Team:
+            def __init__(self, live_games):
+                self.live_games = live_games
+                self.remaining_games = [{'state': 'Preview'}]
+
+        def reply(live_games):
+            slack_mlb = SlackMLB.__new__(SlackMLB)
+            slack_mlb.option = 'scores'
+            slack_mlb.team = 'boston'
+            slack_mlb.data = DataContext(SnapshotStore())
+            slack_mlb.data.get(('mlb', 'team', 'boston'), lambda: Team(live_games))
+            return slack_mlb
+
+        self.assertEqual(reply([{'state': 'Live'}])._reply_ttl(), REPLY_TTLS['live'])
+        self.assertEqual(reply([])._reply_ttl(), REPLY_TTLS['final'])
+
+
+class DataContextTest(unittest.TestCase):
+
+    def test_objects_built_once_per_reply(self):
+        """Test a reply's data context builds each object once and counts constructions"""
+        class League:
+            pass
+        context = DataContext(SnapshotStore())
+        league = context.get(('test', 'league'), League)
+        self.assertIs(context.get(('test', 'league'), League), league)
+        context.get(('test', 'team', 'boston'), League)
+        self.assertEqual(context.stats, {'loaded': 2, 'reused': 1})
+        self.assertEqual(construction_stats()['League'], 2)
+        self.assertEqual(set(context.versions), {('test', 'league'), ('test', 'team', 'boston')})
+        self.assertIs(context.loaded(('test', 'league')), league)
+        self.assertIsNone(context.loaded(('test', 'team', 'chicago')))
+
+
+class RunPartsTest(unittest.TestCase):
+
+    def test_parts_run_concurrently_with_timeout(self):
+        """Test reply parts run together and slow or failing parts are left out"""
+        start = time.monotonic()
+        results = run_parts({
+            'stats': lambda: time.sleep(0.1) or 'stats',
+            'scores': lambda: time.sleep(0.1) or 'scores',
+            'schedule': lambda: 1 / 0,
+            'roster': lambda: time.sleep(1)
+        }, timeout=0.3)
+        self.assertEqual(results, {'stats': 'stats', 'scores': 'scores'})
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_timeout_starts_when_part_runs(self):
+        """Test time queued behind a busy pool doesn't time parts out"""
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        results = run_parts({
+            'stats': lambda: time.sleep(0.2) or 'stats',
+            'scores': lambda: time.sleep(0.2) or 'scores'
+        }, timeout=0.3, executor=executor)
+        self.assertEqual(results, {'stats': 'stats', 'scores': 'scores'})
+        executor.shutdown()
+
+
+class ScheduleIndexTest(unittest.TestCase):
+
+    def test_week_and_date_lookups(self):
+        """Test upcoming week and played games are found by date"""
+        schedule = [
+            {'date': date, 'week': week, 'homeTeam': {'Abbreviation': home}, 'awayTeam': {'Abbreviation': away}}
+            for date, week, home, away in [
+                ('2018-09-16', '2', 'NE', 'JAX'),
+                ('2018-09-06', '1', 'PHI', 'ATL'),
+                ('2018-09-09', '1', 'NE', 'HOU'),
+                ('2018-09-13', '2', 'CIN', 'BAL')
+            ]
+        ]
+        index = ScheduleIndex(schedule)
+        now = datetime.datetime(2018, 9, 13, 20)
+        self.assertEqual(index.upcoming_week(now), '2')
+        played, unplayed = index.played_split('2', now)
+        self.assertEqual([i['homeTeam']['Abbreviation'] for i in played], ['CIN'])
+        self.assertEqual([i['homeTeam']['Abbreviation'] for i in unplayed], ['NE'])
+        self.assertEqual(index.upcoming_week(datetime.datetime(2018, 9, 13)), '2')
+        self.assertEqual(index.played_split('2', datetime.datetime(2018, 9, 13))[0], [])
+        self.assertEqual([i['date'] for i in index.team_games('ne')], ['2018-09-09', '2018-09-16'])
+        self.assertEqual(len(index.current_games(datetime.datetime(2018, 9, 12))), 2)
+        self.assertIsNone(index.upcoming_week(datetime.datetime(2019, 1, 1)))
+
 
 if __name__ == '__main__':
     sys.path.insert(1, "/jockbot/")
@@ -0,0 +1,62 @@
+import collections
+import threading
+import time
+
+
+class TTLCache:
+    """
+    Thread safe in-memory cache with per entry expiry and LRU eviction
+    """
+    def __init__(self, maxsize=1000, ttl=3600):
+        self.maxsize = int(maxsize)
+        self.ttl = ttl
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Return the cached value for key or default if missing or expired
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[1] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry:
+                del self.entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        """
+        Cache value for key, evicting the least recently used entries if full
+        """
+        if ttl is None:
+            ttl = self.ttl
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def stats(self):
+        """
+        Return cache size and hit/miss counters
+        """
+        with self.lock:
+            return {'size': len(self.entries), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,53 @@
+import abc
+import functools
+
+from utils.exceptions import BotCommandError
+
+
+class BaseCommand(abc.ABC):
+    """
+    Base class for bot commands
+
+    __init__ only parses the Slack event into options and args, run_cmd
+    builds the reply. run_cmd runs at most once per command object, later
+    calls return the first reply, and calling it from __init__ is an error
+    so a command can't fetch its data twice. Commands must implement
+    run_cmd.
+    """
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if '__init__' in cls.__dict__:
+            cls.__init__ = _guard_init(cls.__dict__['__init__'])
+        if 'run_cmd' in cls.__dict__:
+            cls.run_cmd = _run_once(cls.__dict__['run_cmd'])
+
+    @abc.abstractmethod
+    def run_cmd(self):
+        """
+        Build and return the command's reply
+        """
+
+
+def _guard_init(init):
+    @functools.wraps(init)
+    def __init__(self, *args, **kwargs):
+        outer = not getattr(self, '_constructing', False)
+        self._constructing = True
+        try:
+            init(self, *args, **kwargs)
+        finally:
+            if outer:
+                self._constructing = False
+    return __init__
+
+
+def _run_once(run_cmd):
+    @functools.wraps(run_cmd)
+    def run(self, *args, **kwargs):
+        if getattr(self, '_constructing', False):
+            name = f'{type(self).__module__}.{type(self).__name__}'
+            raise BotCommandError(f'{name} must not call run_cmd from __init__')
+        if '_response' not in self.__dict__:
+            self._response = run_cmd(self, *args, **kwargs)
+        return self._response
+    return run
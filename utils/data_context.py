@@ -0,0 +1,75 @@
+import collections
+import threading
+
+from utils.snapshots import SNAPSHOTS
+
+
+# Upstream objects actually constructed, by class name, across all requests
+CONSTRUCTIONS = collections.Counter()
+CONSTRUCTIONS_LOCK = threading.Lock()
+
+
+def constructed(loader):
+    """
+    Wrap a loader to count the objects it constructs
+    """
+    def load():
+        value = loader()
+        with CONSTRUCTIONS_LOCK:
+            CONSTRUCTIONS[value.__class__.__name__] += 1
+        return value
+    return load
+
+
+class DataContext:
+    """
+    League and team objects used to build one reply
+
+    Each key is read from the snapshot store once per reply and reused by
+    every part of the reply that needs it. The context records the snapshot
+    versions it used and the age of the oldest stale snapshot.
+    """
+    def __init__(self, snapshots=SNAPSHOTS):
+        self.snapshots = snapshots
+        self.objects = {}
+        self.versions = {}
+        self.stale_age = None
+        self.counters = collections.Counter()
+        self.lock = threading.Lock()
+
+    def get(self, key, loader):
+        """
+        Return the object for key, loading it on first use in this reply
+        """
+        with self.lock:
+            if key in self.objects:
+                self.counters['reused'] += 1
+                return self.objects[key]
+        snapshot = self.snapshots.get(key, constructed(loader))
+        with self.lock:
+            self.counters['loaded'] += 1
+            self.objects[key] = snapshot.value
+            self.versions[key] = snapshot.version
+            if snapshot.stale:
+                self.stale_age = max(self.stale_age or 0, snapshot.age)
+        return snapshot.value
+
+    def loaded(self, key):
+        """
+        Return the object for key if this reply already loaded it, else None
+        """
+        with self.lock:
+            return self.objects.get(key)
+
+    @property
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+
+def construction_stats():
+    """
+    Return the number of upstream objects constructed by class name
+    """
+    with CONSTRUCTIONS_LOCK:
+        return dict(CONSTRUCTIONS)
@@ -47,3 +47,7 @@ class NHLRequestException(NHLException):
 class NFLRequestException(Exception):
     """Base class for NFL API requests exceptions"""
     pass
+
+class BotCommandError(JockBotException):
+    """Base class for bot command lifecycle errors"""
+    pass
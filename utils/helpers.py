@@ -3,15 +3,28 @@ import logging
 import os
 import requests
 import sys
+import threading
 import time
 
 from functools import wraps
-from requests.exceptions import ConnectTimeout, ConnectionError
+from types import MappingProxyType
+from requests.exceptions import RequestException
 from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.util.retry import Retry
 
 from utils.exceptions import JockBotException
 
+CONFIG_PATH = '/jockbot/utils/config/'
+HTTP_POOL_HOSTS = 10
+HTTP_POOL_SIZE = 10
+# Retries of connection errors and 502/503/504 responses, kept short so a
+# failing API is reported within a command worker's latency budget
+HTTP_RETRIES = 2
+HTTP_BACKOFF = 0.5
+HTTP_TIMEOUT = 10
+HTTP_SESSION = None
+HTTP_SESSION_LOCK = threading.Lock()
+
 
 class JalBotRequestsException(Exception):
     """Base class for JalBot API requests exceptions"""
@@ -59,20 +72,91 @@ def set_timeout(timeout=None):
     return timeout
 
 
+class ConfigStore:
+    """
+    Process wide store of parsed config files
+
+    Each file is parsed once and reparsed only when its mtime changes.
+    Configs are handed out as read-only views so callers can share them.
+    """
+    def __init__(self, config_path):
+        self.config_path = config_path
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, config_file):
+        path = os.path.join(self.config_path, config_file)
+        mtime = os.stat(path).st_mtime_ns
+        entry = self.entries.get(config_file)
+        if entry and entry[0] == mtime:
+            return entry[1]
+        with self.lock:
+            entry = self.entries.get(config_file)
+            if not entry or entry[0] != mtime:
+                entry = (mtime, self.load(path))
+                self.entries[config_file] = entry
+        return entry[1]
+
+    @staticmethod
+    def load(path):
+        with open(path, 'r') as f:
+            config = json.load(f)
+        if config.get('env'):
+            for env_var in config['env']:
+                config[env_var] = os.environ[env_var]
+        config.pop('env', None)
+        return freeze(config)
+
+
+def freeze(obj):
+    """
+    Return a read-only copy of parsed JSON
+    """
+    if isinstance(obj, dict):
+        return MappingProxyType({k: freeze(v) for k, v in obj.items()})
+    if isinstance(obj, list):
+        return tuple(freeze(i) for i in obj)
+    return obj
+
+
+CONFIGS = ConfigStore(CONFIG_PATH)
+
+
 def get_config(config_file):
     """
     Get configuration for command
     :return:
     """
-    with open('/jockbot/utils/config/{}'.format(config_file), 'r') as f:
-        config = json.load(f)
-    if 'env' not in config.keys():
-        config['env'] = None
-    if config['env']:
-        for env_var in config['env']:
-            config[env_var] = os.environ[env_var]
-        del config['env']
-    return config
+    return CONFIGS.get(config_file)
+
+
+def http_session():
+    """
+    Return the process wide requests session
+
+    The session keeps a keep-alive connection pool per host and retries
+    connection errors and 502/503/504 responses for both http and https.
+    Once retries run out the last response is returned so callers report
+    its status code. urllib3's pools are thread safe so the session is
+    shared by all command workers, every request should pass a timeout.
+    """
+    global HTTP_SESSION
+    if HTTP_SESSION is None:
+        with HTTP_SESSION_LOCK:
+            if HTTP_SESSION is None:
+                retries = Retry(total=HTTP_RETRIES,
+                                backoff_factor=HTTP_BACKOFF,
+                                status_forcelist=[502, 503, 504],
+                                raise_on_status=False,
+                                respect_retry_after_header=False)
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS,
+                                      pool_maxsize=HTTP_POOL_SIZE,
+                                      max_retries=retries)
+                session = requests.session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                HTTP_SESSION = session
+    return HTTP_SESSION
 
 
 def try_request(command, *args, **kwargs):
@@ -80,14 +164,11 @@ def try_request(command, *args, **kwargs):
     requests wrapper for API calls
     """
     command = command.capitalize()
-    session = requests.session()
-    retries = Retry(total=5, backoff_factor=1, status_forcelist=[ 502, 503, 504 ])
-    session.mount('http://', HTTPAdapter(max_retries=retries))
+    kwargs.setdefault('timeout', HTTP_TIMEOUT)
     try:
-        # request = requests.request(*args, **kwargs)
-        request = session.get(*args, **kwargs)
+        request = http_session().get(*args, **kwargs)
         logging.info(f"{command} | {request.status_code}")
-    except (ConnectTimeout, ConnectionError) as err:
+    except RequestException as err:
         err_name = err.__class__.__name__
         raise JalBotRequestsException(f"{command} API Error {err_name}")
     if request.status_code not in range(200, 299):
@@ -0,0 +1,80 @@
+import importlib
+import inspect
+import logging
+import os
+import threading
+
+from utils.command import BaseCommand
+from utils.exceptions import BotCommandError
+
+
+class CommandRegistry:
+    """
+    Registry of bot commands that imports command modules on first use
+
+    Command names come from the module file names in the commands package
+    and aliases from config, so nothing is imported until a command runs or
+    is preloaded.
+    """
+    def __init__(self, command_path, package='commands', aliases=None):
+        self.package = package
+        self.aliases = dict(aliases or {})
+        self.names = sorted(
+            i[:-3] for i in os.listdir(command_path)
+            if i.endswith('.py') and not i.startswith('_')
+        )
+        self.loaded = {}
+        self.preloading = None
+        self.lock = threading.Lock()
+        logging.info(f"Registered bot commands | {', '.join(self.names)}")
+
+    def resolve(self, name):
+        """
+        Return the command name for a name or alias
+        """
+        return self.aliases.get(name, name)
+
+    def __contains__(self, name):
+        return self.resolve(name) in self.names
+
+    def get(self, name):
+        """
+        Return the BotCommand class for name, importing it if needed
+        """
+        name = self.resolve(name)
+        if name not in self.names:
+            return None
+        cmd = self.loaded.get(name)
+        if cmd:
+            return cmd
+        with self.lock:
+            if name not in self.loaded:
+                self.loaded[name] = self._import(name)
+        return self.loaded[name]
+
+    def _import(self, name):
+        logging.info(f'LOADING {self.package}.{name}')
+        module = importlib.import_module(f'{self.package}.{name}')
+        cmd = getattr(module, 'BotCommand', None)
+        if not isinstance(cmd, type) or not issubclass(cmd, BaseCommand):
+            raise BotCommandError(f'{self.package}.{name}.BotCommand must subclass BaseCommand')
+        if inspect.isabstract(cmd):
+            raise BotCommandError(f'{self.package}.{name}.BotCommand must implement run_cmd')
+        return cmd
+
+    def preload(self, names):
+        """
+        Import the given commands in a background thread, only the first call
+        starts it so reconnects don't preload again
+        """
+        def load():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as err:
+                    logging.error(f'Error preloading command {name} | {err}')
+        with self.lock:
+            if self.preloading is None:
+                self.preloading = threading.Thread(target=load, name='command-preload', daemon=True)
+                self.preloading.start()
+        return self.preloading
@@ -0,0 +1,68 @@
+import collections
+import threading
+
+from utils.cache import TTLCache
+from utils.snapshots import SNAPSHOTS
+
+
+# Seconds a reply is reused for, by the state of the games it shows
+REPLY_TTLS = {
+    'live': 20,
+    'final': 300,
+    'standings': 3 * 3600
+}
+
+
+def reply_key(league, option, args):
+    """
+    Return the normalized cache key of a league command
+    """
+    return (league, option, tuple(sorted((k, str(v).strip()) for k, v in args.items())))
+
+
+class ReplyCache:
+    """
+    Cache of formatted command replies
+
+    Each reply is stored with the versions of the snapshots it was built
+    from and is dropped as soon as any of them is refreshed, its TTL only
+    bounds how long a reply is reused while the snapshots stay the same
+    """
+    def __init__(self, snapshots=SNAPSHOTS, maxsize=500):
+        self.snapshots = snapshots
+        self.entries = TTLCache(maxsize=maxsize)
+        self.counters = collections.Counter()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the cached reply for key or None
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            outcome = 'misses'
+        elif any(self.snapshots.version(k) != v for k, v in entry[1].items()):
+            self.entries.delete(key)
+            entry = None
+            outcome = 'invalidated'
+        else:
+            outcome = 'hits'
+        with self.lock:
+            self.counters[outcome] += 1
+        return entry[0] if entry else None
+
+    def set(self, key, reply, versions, ttl):
+        """
+        Cache a reply built from the given snapshot versions
+        """
+        self.entries.set(key, (reply, dict(versions)), ttl=ttl)
+
+    @property
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        stats['size'] = len(self.entries)
+        return stats
+
+
+REPLIES = ReplyCache()
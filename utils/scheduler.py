@@ -0,0 +1,90 @@
+import collections
+import logging
+import threading
+import traceback
+
+
+class CommandScheduler:
+    """
+    Run bot commands on a fixed pool of worker threads
+
+    Jobs are queued per channel and channels are served round robin so one
+    busy channel can't starve the others. The queue is bounded both in total
+    and per channel, submit returns False once either limit is reached.
+    """
+    def __init__(self, workers=4, max_queued=50, max_per_channel=10):
+        self.workers = int(workers)
+        self.max_queued = int(max_queued)
+        self.max_per_channel = int(max_per_channel)
+        self.channels = collections.OrderedDict()
+        self.queued = 0
+        self.running = 0
+        self.counters = collections.Counter()
+        self.condition = threading.Condition()
+        self.threads = []
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'command-worker-{i}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, channel, func, *args, **kwargs):
+        """
+        Queue a job for the given channel, return False if the queue is full
+        """
+        with self.condition:
+            jobs = self.channels.get(channel)
+            channel_depth = len(jobs) if jobs else 0
+            if self.queued >= self.max_queued or channel_depth >= self.max_per_channel:
+                self.counters['rejected'] += 1
+                logging.info(f'Command queue full | CHANNEL: {channel} | {self.stats}')
+                return False
+            if jobs is None:
+                jobs = self.channels[channel] = collections.deque()
+            jobs.append((func, args, kwargs))
+            self.queued += 1
+            self.counters['submitted'] += 1
+            self.condition.notify()
+        return True
+
+    def _next_job(self):
+        """
+        Pop a job from the channel at the front of the rotation
+
+        Must be called with the condition held
+        """
+        channel, jobs = self.channels.popitem(last=False)
+        job = jobs.popleft()
+        if jobs:
+            self.channels[channel] = jobs
+        self.queued -= 1
+        return job
+
+    def _worker(self):
+        while True:
+            with self.condition:
+                while not self.queued:
+                    self.condition.wait()
+                func, args, kwargs = self._next_job()
+                self.running += 1
+            outcome = 'completed'
+            try:
+                func(*args, **kwargs)
+            except Exception as err:
+                outcome = 'failed'
+                logging.error(f'Command worker exception | {err}\n{traceback.format_exc()}')
+            finally:
+                with self.condition:
+                    self.running -= 1
+                    self.counters[outcome] += 1
+
+    @property
+    def stats(self):
+        """
+        Return a snapshot of the scheduler's queue depth and counters
+        """
+        with self.condition:
+            stats = dict(self.counters)
+            stats['queued'] = self.queued
+            stats['running'] = self.running
+            stats['channels'] = {k: len(v) for k, v in self.channels.items()}
+        return stats
@@ -0,0 +1,82 @@
+import collections
+import threading
+
+
+MAX_TRACKED_KEYS = 1000
+
+
+class Flight:
+    """
+    A call in progress and its outcome
+    """
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Run one call per key at a time
+
+    Callers that arrive while a call for the same key is running wait for
+    it and share its result or exception instead of running their own
+    """
+    def __init__(self, max_tracked_keys=MAX_TRACKED_KEYS):
+        self.flights = {}
+        self.max_tracked_keys = max_tracked_keys
+        self.counters = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def _count(self, key, outcome):
+        """
+        Count an outcome for key, must hold the lock
+        """
+        counters = self.counters.get(key)
+        if counters is None:
+            counters = self.counters[key] = collections.Counter()
+            while len(self.counters) > self.max_tracked_keys:
+                self.counters.popitem(last=False)
+        counters[outcome] += 1
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Return func(*args, **kwargs), or the result of the call already
+        running for key
+        """
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Flight()
+            self._count(key, 'executed' if leader else 'shared')
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = func(*args, **kwargs)
+        except Exception as err:
+            flight.error = err
+            with self.lock:
+                self._count(key, 'errors')
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.done.set()
+        return flight.result
+
+    @property
+    def stats(self):
+        """
+        Return executed, shared and error counts by key
+        """
+        with self.lock:
+            return {key: dict(counters) for key, counters in self.counters.items()}
+
+
+FLIGHTS = SingleFlight()
@@ -1,8 +1,68 @@
+import bisect
+import functools
 import re
 import logging
 
 from utils.exceptions import JockBotException
 
+OPTION_PATTERN = re.compile(r'[\w]*? ([a-z]+?)($|\s-.*)')
+
+
+class ArgGrammar:
+    """
+    Command args compiled into a single regex that tokenizes a message in
+    one pass
+
+    An arg's value starts after "-<name> " or "-<short> " and runs up to the
+    next " -<non digit>" or the end of the text, the first occurrence wins
+    and the long form takes precedence over the short form. A value can't
+    span a newline.
+    """
+    def __init__(self, arg_specs):
+        self.arg_specs = arg_specs
+        self.forms = {}
+        for name, short, arg_type in arg_specs:
+            self.forms.setdefault(name, []).append((name, False))
+            self.forms.setdefault(short, []).append((name, True))
+        markers = '|'.join(re.escape(i) for i in sorted(self.forms, key=len, reverse=True))
+        self.pattern = re.compile(rf'(?P<end>(?= -\D))|(?P<newline>\n)|-(?P<marker>{markers})(?= )')
+        self.flags = [(name, f'--{name}') for name, short, arg_type in arg_specs if arg_type == 'flag']
+
+    def tokenize(self, text):
+        """
+        Return the raw value text for each arg form found in text
+        """
+        ends = []
+        newlines = []
+        markers = []
+        for match in self.pattern.finditer(text):
+            kind = match.lastgroup
+            if kind == 'end':
+                ends.append(match.start())
+            elif kind == 'newline':
+                newlines.append(match.start())
+            else:
+                markers.append((match.group('marker'), match.end() + 1))
+        ends.append(len(text))
+        values = {}
+        for marker, start in markers:
+            stop = ends[bisect.bisect_left(ends, start)]
+            newline = bisect.bisect_left(newlines, start)
+            if newline < len(newlines) and newlines[newline] < stop:
+                continue
+            for form in self.forms[marker]:
+                if form not in values:
+                    values[form] = text[start:stop]
+        return values
+
+
+@functools.lru_cache(maxsize=32)
+def compile_grammar(arg_specs):
+    """
+    Return the compiled grammar for a tuple of (name, short, type) arg specs
+    """
+    return ArgGrammar(arg_specs)
+
 
 class SlackArgParse:
     """
@@ -12,6 +72,9 @@ class SlackArgParse:
         self.cmd_args = command_args
         self.cmd_options = command_options
         self.text = text
+        self.grammar = compile_grammar(
+            tuple((k, v["short"], v["type"]) for k, v in command_args.items())
+        )
         self.args = self.parse_args(self.cmd_args, self.text)
         self.option = self.parse_option(self.text, self.cmd_options)
         self.parse_flags(self.cmd_args, self.text)
@@ -19,32 +82,25 @@ class SlackArgParse:
     def parse_args(self, cmd_args, text):
         """Parse command arguments"""
         args = {}
-        search_args = {
-            i: re.compile(f'(?<=-{i} ).*?(?= -\D|\Z)') for i in cmd_args.keys()
-        }
-        search_short_args = {
-            i: re.compile(f'(?<=-{cmd_args[i]["short"]} ).*?(?= -\D|\Z)') for i in cmd_args.keys()
-        }
-        for k, v in search_args.items():
-            if v.search(text):
-                arg = v.search(text).group()
-                args[k] = self.format_args(cmd_args[k]["type"], arg)
-            elif search_short_args[k].search(text):
-                arg = search_short_args[k].search(text).group()
-                args[k] = self.format_args(cmd_args[k]["type"], arg)
-            else:
+        values = self.grammar.tokenize(text)
+        for k, short, arg_type in self.grammar.arg_specs:
+            arg = values.get((k, False))
+            if arg is None:
+                arg = values.get((k, True))
+            if arg is None:
                 args[k] = False
+            else:
+                args[k] = self.format_args(arg_type, arg)
         return args
 
     def parse_flags(self, cmd_args, text):
-        for k, v in cmd_args.items():
-            if cmd_args[k]["type"] == "flag":
-                if re.search(r'.*--{}.*'.format(k), text):
-                    self.args[k] = True
+        for k, flag in self.grammar.flags:
+            if flag in text:
+                self.args[k] = True
 
     def parse_option(self, text, command_options):
         """Get option from text"""
-        option_fetch = re.match(r'[\w]*? ([a-z]+?)($|\s-.*)', text)
+        option_fetch = OPTION_PATTERN.match(text)
         if not option_fetch:
             return
         option = option_fetch.groups()[0]
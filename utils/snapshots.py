@@ -0,0 +1,120 @@
+import collections
+import concurrent.futures
+import itertools
+import logging
+import threading
+import time
+
+from utils.singleflight import SingleFlight
+
+
+MAX_AGE = 60
+REFRESH_WORKERS = 4
+
+
+class Snapshot(collections.namedtuple('Snapshot', ['value', 'fetched', 'version', 'stale'])):
+    """
+    The last good value loaded for a key
+    """
+    __slots__ = ()
+
+    @property
+    def age(self):
+        return int(time.time() - self.fetched)
+
+
+class SnapshotStore:
+    """
+    Serve the last good value loaded for each key, stale while revalidating
+
+    A key older than its max age is returned immediately marked stale while
+    a background refresh replaces it. Refresh errors are logged and the last
+    good value kept, a loader's error only reaches the caller when the key
+    has never loaded.
+    """
+    def __init__(self, max_age=MAX_AGE, workers=REFRESH_WORKERS):
+        self.max_age = max_age
+        self.snapshots = {}
+        self.refreshing = set()
+        self.versions = itertools.count(1)
+        self.counters = collections.Counter()
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        self.flights = SingleFlight()
+        self.lock = threading.Lock()
+
+    def get(self, key, loader, max_age=None):
+        """
+        Return the Snapshot for key, loading it with loader if there is none
+        """
+        if max_age is None:
+            max_age = self.max_age
+        snapshot = self.snapshots.get(key)
+        if snapshot is None:
+            with self.lock:
+                self.counters['loads'] += 1
+            return self.flights.do(key, self._first_load, key, loader)
+        if time.time() - snapshot.fetched < max_age:
+            with self.lock:
+                self.counters['fresh'] += 1
+            return snapshot
+        with self.lock:
+            self.counters['stale'] += 1
+            if key not in self.refreshing:
+                self.refreshing.add(key)
+                self.executor.submit(self._refresh, key, loader)
+        return snapshot._replace(stale=True)
+
+    def version(self, key):
+        """
+        Return the version of key's current snapshot or None
+        """
+        snapshot = self.snapshots.get(key)
+        return snapshot.version if snapshot else None
+
+    def _first_load(self, key, loader):
+        """
+        Load a key that has no snapshot, concurrent first loads share one call
+        """
+        snapshot = self.snapshots.get(key)
+        if snapshot is not None:
+            return snapshot
+        return self._load(key, loader)
+
+    def _load(self, key, loader):
+        value = loader()
+        snapshot = Snapshot(value, time.time(), next(self.versions), False)
+        self.snapshots[key] = snapshot
+        return snapshot
+
+    def _refresh(self, key, loader):
+        try:
+            self._load(key, loader)
+            outcome = 'refreshed'
+        except Exception as err:
+            outcome = 'refresh_errors'
+            logging.error(f"Snapshot refresh failed, serving last good data | {key} | {err}")
+        with self.lock:
+            self.refreshing.discard(key)
+            self.counters[outcome] += 1
+
+    @property
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats['keys'] = len(self.snapshots)
+            stats['refreshing'] = len(self.refreshing)
+        return stats
+
+
+def age_note(age):
+    """
+    Return a reply footer for data served from a stale snapshot
+    """
+    if age < 120:
+        since = f"{age}s"
+    else:
+        since = f"{age // 60}m"
+    return f"_Data from {since} ago, refreshing_"
+
+
+SNAPSHOTS = SnapshotStore()
@@ -0,0 +1,187 @@
+import collections
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from utils.cache import TTLCache
+
+
+CACHE_PATH = 'stats_cache'
+# Seconds each dataset stays fresh, None never expires
+DATASET_TTLS = {
+    'nfl_standings': 3 * 3600,
+    'nfl_schedule': 6 * 3600,
+    'nfl_boxscores': None,
+    'nfl_scrape': 12 * 3600
+}
+DEFAULT_TTL = 3600
+MAX_BYTES = 100 * 1024 * 1024
+MEMORY_ENTRIES = 500
+
+
+class StatsCache:
+    """
+    Persistent JSON cache of stats data, one file per namespaced key
+
+    Each namespace is a dataset with its own TTL, taken from the file's
+    modification time so entries survive restarts. Files are written
+    atomically and the least recently written files are evicted once the
+    cache grows past max_bytes. Namespaces that never expire are permanent
+    stores, they are never evicted and don't count towards max_bytes.
+    Recently read entries are also held in memory.
+    """
+    def __init__(self, path=CACHE_PATH, ttls=None, max_bytes=MAX_BYTES, memory_entries=MEMORY_ENTRIES):
+        self.path = path
+        self.ttls = dict(DATASET_TTLS, **(ttls or {}))
+        self.max_bytes = max_bytes
+        self.memory = TTLCache(maxsize=memory_entries)
+        # Sizes of evictable files, oldest written first
+        self.sizes = None
+        self.bytes = 0
+        self.counters = collections.defaultdict(collections.Counter)
+        self.lock = threading.Lock()
+
+    def _file(self, namespace, key):
+        return os.path.join(self.path, namespace, f"{key}.json")
+
+    def _ttl(self, namespace):
+        ttl = self.ttls.get(namespace, DEFAULT_TTL)
+        return float('inf') if ttl is None else ttl
+
+    def _permanent(self, namespace):
+        return self.ttls.get(namespace, DEFAULT_TTL) is None
+
+    def _count(self, namespace, counter):
+        with self.lock:
+            self.counters[namespace][counter] += 1
+
+    def get(self, namespace, key):
+        """
+        Return the cached value for a key or None if missing or expired
+        """
+        value = self.memory.get((namespace, key))
+        if value is not None:
+            self._count(namespace, 'hits')
+            return value
+        cache_file = self._file(namespace, key)
+        try:
+            age = time.time() - os.stat(cache_file).st_mtime
+            if age >= self._ttl(namespace):
+                self._count(namespace, 'expired')
+                return None
+            with open(cache_file, 'r') as read_file:
+                value = json.load(read_file)
+        except (FileNotFoundError, ValueError):
+            self._count(namespace, 'misses')
+            return None
+        self.memory.set((namespace, key), value, ttl=self._ttl(namespace) - age)
+        self._count(namespace, 'hits')
+        return value
+
+    def stale(self, namespace, key):
+        """
+        Return a key's value and age in seconds even if expired, or None if
+        it isn't cached
+        """
+        cache_file = self._file(namespace, key)
+        try:
+            age = time.time() - os.stat(cache_file).st_mtime
+            with open(cache_file, 'r') as read_file:
+                return json.load(read_file), int(age)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def set(self, namespace, key, value):
+        """
+        Cache a value, written atomically, evicting old entries if full
+        """
+        cache_file = self._file(namespace, key)
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(cache_file), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(value, f)
+            size = os.path.getsize(tmp_file)
+            os.replace(tmp_file, cache_file)
+        except (OSError, TypeError, ValueError) as err:
+            logging.error(f"Error caching {namespace} {key} | {err}")
+            os.unlink(tmp_file)
+            return
+        self.memory.set((namespace, key), value, ttl=self._ttl(namespace))
+        self._count(namespace, 'writes')
+        if self._permanent(namespace):
+            return
+        with self.lock:
+            self._scan()
+            self.bytes += size - self.sizes.pop(cache_file, 0)
+            self.sizes[cache_file] = size
+            self._evict(keep=cache_file)
+
+    def delete(self, namespace, key):
+        cache_file = self._file(namespace, key)
+        self.memory.delete((namespace, key))
+        try:
+            os.unlink(cache_file)
+        except FileNotFoundError:
+            pass
+        with self.lock:
+            if self.sizes is not None:
+                self.bytes -= self.sizes.pop(cache_file, 0)
+
+    def _scan(self):
+        """
+        Read the size and mtime of every evictable file once, must hold the
+        lock. Later writes are appended so the order stays oldest first.
+        """
+        if self.sizes is not None:
+            return
+        files = []
+        for namespace in os.listdir(self.path) if os.path.isdir(self.path) else []:
+            if self._permanent(namespace):
+                continue
+            for root, dirs, names in os.walk(os.path.join(self.path, namespace)):
+                for name in names:
+                    if name.endswith('.json'):
+                        stat = os.stat(os.path.join(root, name))
+                        files.append((stat.st_mtime, os.path.join(root, name), stat.st_size))
+        self.sizes = collections.OrderedDict((i[1], i[2]) for i in sorted(files))
+        self.bytes = sum(self.sizes.values())
+
+    def _evict(self, keep):
+        """
+        Remove the least recently written files until under max_bytes, must
+        hold the lock
+        """
+        if self.bytes <= self.max_bytes:
+            return
+        for cache_file in list(self.sizes):
+            if self.bytes <= self.max_bytes:
+                break
+            if cache_file == keep:
+                continue
+            self.bytes -= self.sizes.pop(cache_file)
+            try:
+                os.unlink(cache_file)
+            except FileNotFoundError:
+                pass
+            namespace = os.path.relpath(cache_file, self.path).split(os.sep)[0]
+            key = os.path.relpath(cache_file, os.path.join(self.path, namespace))[:-len('.json')]
+            self.memory.delete((namespace, key.replace(os.sep, '/')))
+            self.counters[namespace]['evictions'] += 1
+
+    @property
+    def stats(self):
+        """
+        Return hit, miss, expiry, write and eviction counters by namespace
+        """
+        with self.lock:
+            stats = {k: dict(v) for k, v in self.counters.items()}
+            if self.sizes is not None:
+                stats['bytes'] = self.bytes
+        return stats
+
+
+STATS_CACHE = StatsCache()
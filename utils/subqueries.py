@@ -0,0 +1,63 @@
+import concurrent.futures
+import logging
+import threading
+import time
+
+
+PART_TIMEOUT = 8
+# Enough for every scheduler worker (4) to fan out to every league with a
+# scores reply (2) at once
+POOL_WORKERS = 8
+LEAGUE_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=POOL_WORKERS, thread_name_prefix='league')
+
+
+class Part:
+    """
+    A reply part submitted to a pool, recording when it starts running
+    """
+    def __init__(self, func):
+        self.func = func
+        self.started = threading.Event()
+        self.start = None
+
+    def __call__(self):
+        self.start = time.monotonic()
+        self.started.set()
+        return self.func()
+
+    def result(self, future, timeout):
+        """
+        Return the part's result, allowing timeout seconds once it starts
+        and as long again to wait for a worker
+        """
+        if not self.started.wait(timeout):
+            raise concurrent.futures.TimeoutError
+        return future.result(timeout=max(0, self.start + timeout - time.monotonic()))
+
+
+def run_parts(parts, timeout=PART_TIMEOUT, executor=LEAGUE_POOL, timeouts=None):
+    """
+    Run the independent parts of a reply concurrently
+
+    parts maps a name to a callable. Returns a dict of each part's result,
+    parts that raise or don't finish within their timeout are logged and
+    left out so the reply can be rendered without them. timeouts overrides
+    timeout for individual parts. A part's timeout starts when a worker
+    picks it up, so time queued on a busy pool doesn't count against it.
+    """
+    timeouts = timeouts or {}
+    submitted = {}
+    for name, func in parts.items():
+        part = Part(func)
+        submitted[name] = (part, executor.submit(part))
+    results = {}
+    for name, (part, future) in submitted.items():
+        part_timeout = timeouts.get(name, timeout)
+        try:
+            results[name] = part.result(future, part_timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            logging.error(f"Reply part timed out after {part_timeout}s | {name}")
+        except Exception as err:
+            logging.error(f"Reply part failed | {name} | {err}")
+    return results